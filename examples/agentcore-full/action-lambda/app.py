@@ -2,6 +2,17 @@ import json
 import random
 from datetime import datetime
 
+from cache import TTLCache
+
+# Per-tool result caches, by (apiPath, httpMethod). Only tools whose calls
+# have no side effects belong here: paths not listed (e.g. one that books
+# or writes something) run on every request.
+CACHES = {
+    ("/weather", "GET"): TTLCache(ttl_seconds=300, max_entries=256, ignore_case=True),
+    # A read-only query, even though it is sent as POST
+    ("/database/query", "POST"): TTLCache(ttl_seconds=60, max_entries=128),
+}
+
 def get_weather(location):
     """Simulate weather API call"""
     conditions = ["Sunny", "Cloudy", "Rainy", "Partly Cloudy", "Stormy"]
@@ -52,17 +63,24 @@ def handler(event, context):
         http_method = event.get("httpMethod", "")
         parameters = event.get("parameters", [])
         
-        # Convert parameters list to dict
+        # Request body fields (POST operations) arrive as a properties list
+        properties = (
+            event.get("requestBody", {})
+            .get("content", {})
+            .get("application/json", {})
+            .get("properties", [])
+        )
+
+        # Convert parameters and body properties to dicts
         params = {p["name"]: p["value"] for p in parameters}
+        body = {p["name"]: p["value"] for p in properties}
         
         # Route to appropriate handler
         if api_path == "/weather" and http_method == "GET":
-            location = params.get("location", "Unknown")
-            result = get_weather(location)
+            call = lambda: get_weather(params.get("location", "Unknown"))
             
         elif api_path == "/database/query" and http_method == "POST":
-            query = params.get("query", "")
-            result = query_database(query)
+            call = lambda: query_database(body.get("query", ""))
             
         else:
             return {
@@ -80,6 +98,14 @@ def handler(event, context):
                 }
             }
         
+        cache = CACHES.get((api_path, http_method))
+        if cache is None:
+            result = call()
+        else:
+            key = cache.key(api_path, http_method, parameters, properties)
+            result, status = cache.get_or_call(key, call)
+            print(f"Cache {status}: {http_method} {api_path}")
+
         # Return response in Bedrock Agent format
         return {
             "messageVersion": "1.0",
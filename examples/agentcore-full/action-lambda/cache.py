@@ -0,0 +1,86 @@
+"""Per-container result cache for action group tools.
+
+Lambda reuses a warm container across invocations, so results kept at
+module level answer repeated questions, within one agent session or
+across sessions, until their TTL runs out. Identical lookups running at
+the same time in one container (handler threads) share a single call.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+HIT = 'hit'
+MISS = 'miss'
+COALESCED = 'coalesced'
+
+class TTLCache:
+    """LRU cache of tool results with a TTL and a maximum size"""
+
+    def __init__(self, ttl_seconds, max_entries, ignore_case=False):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.ignore_case = ignore_case
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def key(self, api_path, http_method, parameters, properties=()):
+        """Cache key of a request: path, method, its parameters and its
+        JSON request body properties by name, with whitespace collapsed
+        (and case folded if ignore_case)"""
+        return (
+            api_path,
+            http_method.upper(),
+            self._normalize(parameters),
+            self._normalize(properties),
+        )
+
+    def _normalize(self, fields):
+        values = []
+        for field in fields:
+            value = ' '.join(str(field.get('value', '')).split())
+            if self.ignore_case:
+                value = value.casefold()
+            values.append((field['name'], value))
+        return tuple(sorted(values))
+
+    def get_or_call(self, key, function):
+        """Return (result, status): the cached result (HIT), the result of a
+        call already running for the same key (COALESCED), or the result of
+        calling `function` (MISS). Exceptions are not cached.
+
+        The cached result is shared between callers, so do not modify it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return result, HIT
+                del self._entries[key]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            return future.result(), COALESCED
+
+        try:
+            result = function()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(result)
+        return result, MISS
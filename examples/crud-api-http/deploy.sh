@@ -4,6 +4,7 @@ set -e
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 TERRAFORM_DIR="$SCRIPT_DIR/terraform"
 APP_DIR="$SCRIPT_DIR/fastapi-app"
+PROCESSOR_DIR="$SCRIPT_DIR/stream-processor"
 
 IMAGE_TAG=${1:-latest}
 AWS_REGION=${AWS_REGION:-us-east-1}
@@ -20,6 +21,19 @@ cd "$TERRAFORM_DIR"
 echo "Step 1: Initializing Terraform..."
 terraform init
 
+# Step 1b: The stream processor Lambda needs its image before it can be created
+echo ""
+echo "Step 1b: Building and pushing stream processor image..."
+terraform apply -target=module.stream_processor_ecr -auto-approve
+PROCESSOR_ECR_URL=$(terraform output -raw stream_processor_ecr_repository_url)
+
+aws ecr get-login-password --region ${AWS_REGION} | docker login --username AWS --password-stdin ${PROCESSOR_ECR_URL}
+docker buildx build \
+  --platform linux/amd64 \
+  --provenance=false \
+  --output type=image,name=${PROCESSOR_ECR_URL}:latest,push=true \
+  "$PROCESSOR_DIR"
+
 # Step 2: Apply infrastructure
 echo ""
 echo "Step 2: Applying infrastructure..."
@@ -51,6 +65,9 @@ SERVICE_NAME=$(terraform output -raw service_name)
 
 aws ecs update-service --region ${AWS_REGION} --cluster ${CLUSTER_NAME} --service ${SERVICE_NAME} --force-new-deployment --no-cli-pager > /dev/null
 
+PROCESSOR_FUNCTION=$(terraform output -raw stream_processor_function_name)
+aws lambda update-function-code --region ${AWS_REGION} --function-name ${PROCESSOR_FUNCTION} --image-uri ${PROCESSOR_ECR_URL}:latest --no-cli-pager > /dev/null
+
 echo ""
 echo "=== Deployment Complete ==="
 API_ENDPOINT=$(terraform output -raw api_endpoint)
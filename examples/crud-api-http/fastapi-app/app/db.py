@@ -0,0 +1,455 @@
+"""Async DynamoDB data access for the Items API.
+
+Handlers are ``async def``, so DynamoDB calls must not block the event loop.
+``ItemsTable`` keeps one aiobotocore client open for the lifetime of the
+process; its aiohttp connector pools connections to DynamoDB, and timeouts
+and retries come from a single botocore ``Config``.
+
+Values cross the boundary as plain Python: numbers come back as ``int`` or
+``float`` (never ``Decimal``), ready to be JSON encoded without another
+conversion pass.
+"""
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import time
+from contextlib import AsyncExitStack
+from decimal import Decimal
+
+import aioboto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .metrics import record_dynamodb_call
+
+
+# Global secondary indexes defined in terraform/main.tf. Every item is
+# written with entity_type = ITEM_ENTITY_TYPE, the index partition key.
+ITEM_ENTITY_TYPE = "ITEM"
+NAME_INDEX = "name-index"
+PRICE_INDEX = "price-index"
+QUANTITY_INDEX = "quantity-index"
+CREATED_INDEX = "created-index"
+
+# DynamoDB API limits per BatchWriteItem / BatchGetItem call
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+
+
+def chunked(values, size):
+    """Split a list into consecutive chunks of at most ``size`` elements"""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+async def backoff(attempt: int, base: float = 0.05, cap: float = 2.0):
+    """Sleep with exponential backoff and full jitter"""
+    await asyncio.sleep(random.uniform(0, min(cap, base * (2 ** attempt))))
+
+
+def serialize(value) -> dict:
+    """Convert a Python value into a DynamoDB attribute value"""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"DynamoDB cannot store {value}")
+        return {'N': repr(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {k: serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(v) for v in value]}
+    if isinstance(value, bytes):
+        return {'B': value}
+    raise TypeError(f"Unsupported type for DynamoDB: {type(value).__name__}")
+
+
+def serialize_item(item: dict) -> dict:
+    return {k: serialize(v) for k, v in item.items()}
+
+
+def deserialize(value: dict):
+    """Convert a DynamoDB attribute value into a JSON-ready Python value.
+
+    Numbers become ``int`` or ``float`` and sets become lists.
+    """
+    for kind, data in value.items():
+        if kind == 'S':
+            return data
+        if kind == 'N':
+            if '.' in data or 'e' in data or 'E' in data:
+                return float(data)
+            return int(data)
+        if kind == 'BOOL':
+            return data
+        if kind == 'NULL':
+            return None
+        if kind == 'M':
+            return {k: deserialize(v) for k, v in data.items()}
+        if kind == 'L':
+            return [deserialize(v) for v in data]
+        if kind == 'NS':
+            return [deserialize({'N': v}) for v in data]
+        return list(data) if kind in ('SS', 'BS') else data
+    raise ValueError("Empty attribute value")
+
+
+def deserialize_item(item: dict) -> dict:
+    return {k: deserialize(v) for k, v in item.items()}
+
+
+def encode_page_token(last_evaluated_key: dict) -> str:
+    """Turn a LastEvaluatedKey into an opaque, URL-safe continuation token"""
+    raw = json.dumps(serialize_item(last_evaluated_key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_page_token(token: str) -> dict:
+    """Turn a continuation token back into an ExclusiveStartKey.
+
+    Raises ``ValueError`` if the token was not produced by ``encode_page_token``.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return deserialize_item(json.loads(raw))
+    except Exception as e:
+        raise ValueError("Invalid page token") from e
+
+
+# Request parameters holding items/keys, and response fields holding items
+_ITEM_PARAMS = ('Item', 'Key', 'ExclusiveStartKey', 'ExpressionAttributeValues')
+_ITEM_FIELDS = ('Item', 'Attributes', 'LastEvaluatedKey')
+
+
+def dynamodb_config() -> Config:
+    """Build the client configuration from environment variables"""
+    return Config(
+        connect_timeout=float(os.getenv('DYNAMODB_CONNECT_TIMEOUT', '1')),
+        read_timeout=float(os.getenv('DYNAMODB_READ_TIMEOUT', '3')),
+        max_pool_connections=int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '50')),
+        retries={
+            'mode': 'standard',
+            'max_attempts': int(os.getenv('DYNAMODB_MAX_ATTEMPTS', '3')),
+        },
+    )
+
+
+class ItemsTable:
+    """Async wrapper around the items table.
+
+    Call ``connect()`` once on startup and ``close()`` on shutdown; every
+    request shares the same connection pool in between. Methods take the
+    same keyword arguments as the boto3 ``Table`` resource, with plain
+    Python values, and return the client response with items converted by
+    ``deserialize_item``.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        region_name: str,
+        config: Config,
+        stats_table_name: str = None,
+        idempotency_table_name: str = None,
+    ):
+        self.table_name = table_name
+        self.stats_table_name = stats_table_name
+        self.idempotency_table_name = idempotency_table_name
+        self.region_name = region_name
+        self.config = config
+        self.batch_max_attempts = int(os.getenv('DYNAMODB_BATCH_MAX_ATTEMPTS', '5'))
+        self.batch_concurrency = int(os.getenv('DYNAMODB_BATCH_CONCURRENCY', '4'))
+        self._session = aioboto3.Session()
+        self._stack = None
+        self._client = None
+
+    @classmethod
+    def from_env(cls) -> "ItemsTable":
+        return cls(
+            table_name=os.getenv('DYNAMODB_TABLE_NAME', 'items'),
+            region_name=os.getenv('AWS_REGION', 'us-east-1'),
+            config=dynamodb_config(),
+            stats_table_name=os.getenv('STATS_TABLE_NAME') or None,
+            idempotency_table_name=os.getenv('IDEMPOTENCY_TABLE_NAME') or None,
+        )
+
+    async def connect(self):
+        """Open the DynamoDB client and its connection pool"""
+        if self._client is not None:
+            return
+        self._stack = AsyncExitStack()
+        self._client = await self._stack.enter_async_context(
+            self._session.client(
+                'dynamodb',
+                region_name=self.region_name,
+                endpoint_url=os.getenv('DYNAMODB_ENDPOINT_URL') or None,
+                config=self.config,
+            )
+        )
+
+    async def close(self):
+        """Close the connection pool"""
+        if self._stack is not None:
+            await self._stack.aclose()
+        self._stack = None
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            raise RuntimeError("ItemsTable is not connected; call connect() first")
+        return self._client
+
+    async def _invoke(self, operation: str, **kwargs) -> dict:
+        """Call the client, reporting duration and consumed capacity to
+        the current request's usage (see ``metrics``)"""
+        if operation != 'describe_table':
+            kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await getattr(self.client, operation)(**kwargs)
+            return response
+        finally:
+            record_dynamodb_call(
+                operation,
+                time.perf_counter() - started,
+                response.get('ConsumedCapacity') if response else None,
+            )
+
+    async def _call(self, operation: str, **kwargs) -> dict:
+        for param in _ITEM_PARAMS:
+            if param in kwargs:
+                kwargs[param] = serialize_item(kwargs[param])
+
+        response = await self._invoke(operation, TableName=self.table_name, **kwargs)
+
+        for field in _ITEM_FIELDS:
+            if field in response:
+                response[field] = deserialize_item(response[field])
+        if 'Items' in response:
+            response['Items'] = [deserialize_item(item) for item in response['Items']]
+        return response
+
+    async def table_status(self) -> str:
+        response = await self._invoke('describe_table', TableName=self.table_name)
+        return response['Table']['TableStatus']
+
+    async def ping(self):
+        """Cheapest data-plane round trip: an eventually consistent GetItem of
+        a key that never exists. Proves the table is reachable and readable
+        with the task's credentials (``DescribeTable`` only reaches the
+        control plane)."""
+        await self._invoke(
+            'get_item',
+            TableName=self.table_name,
+            Key={'id': {'S': '__health__'}},
+            ProjectionExpression='#id',
+            ExpressionAttributeNames={'#id': 'id'},
+        )
+
+    async def item_stats(self):
+        """Read the aggregates maintained by the stream processor.
+
+        Returns ``None`` if no stats table is configured or nothing has been
+        aggregated yet.
+        """
+        if not self.stats_table_name:
+            return None
+        response = await self._invoke(
+            'get_item',
+            TableName=self.stats_table_name,
+            Key={'pk': {'S': 'summary'}},
+        )
+        return deserialize_item(response['Item']) if 'Item' in response else None
+
+    async def put_item(self, **kwargs):
+        return await self._call('put_item', **kwargs)
+
+    async def get_item(self, **kwargs):
+        return await self._call('get_item', **kwargs)
+
+    async def scan(self, **kwargs):
+        return await self._call('scan', **kwargs)
+
+    async def query(self, **kwargs):
+        return await self._call('query', **kwargs)
+
+    async def update_item(self, **kwargs):
+        return await self._call('update_item', **kwargs)
+
+    async def delete_item(self, **kwargs):
+        return await self._call('delete_item', **kwargs)
+
+    async def put_item_once(self, item: dict, record: dict):
+        """Write ``item`` and its idempotency ``record`` in one transaction.
+
+        ``record`` is keyed by ``pk`` and carries an ``expires_at`` epoch
+        time. Returns ``None`` once both are written, or the stored record
+        (writing nothing) if an unexpired record already holds that key.
+        """
+        transact_items = [
+            {
+                'Put': {
+                    'TableName': self.idempotency_table_name,
+                    'Item': serialize_item(record),
+                    'ConditionExpression': 'attribute_not_exists(#pk) OR #expires_at < :now',
+                    'ExpressionAttributeNames': {'#pk': 'pk', '#expires_at': 'expires_at'},
+                    'ExpressionAttributeValues': {':now': serialize(int(time.time()))},
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+                }
+            },
+            {
+                'Put': {
+                    'TableName': self.table_name,
+                    'Item': serialize_item(item),
+                    'ConditionExpression': 'attribute_not_exists(#id)',
+                    'ExpressionAttributeNames': {'#id': 'id'},
+                }
+            },
+        ]
+        for attempt in range(self.batch_max_attempts):
+            try:
+                await self._invoke('transact_write_items', TransactItems=transact_items)
+                return None
+            except ClientError as e:
+                reasons = e.response.get('CancellationReasons') or []
+                if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed' and 'Item' in reasons[0]:
+                    return deserialize_item(reasons[0]['Item'])
+                # A concurrent transaction on the same key: retry, and the
+                # condition check will then return the winner's record
+                conflict = any(reason.get('Code') == 'TransactionConflict' for reason in reasons)
+                if not conflict or attempt + 1 == self.batch_max_attempts:
+                    raise
+                await backoff(attempt)
+
+    async def batch_put_items(self, items):
+        """Write items with BatchWriteItem, 25 per call.
+
+        Chunks run concurrently (bounded by ``DYNAMODB_BATCH_CONCURRENCY``)
+        and ``UnprocessedItems`` are retried with backoff. Returns a dict
+        mapping the ``id`` of every item that could not be written to the
+        error message.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def write_chunk(chunk):
+            requests = [{'PutRequest': {'Item': serialize_item(item)}} for item in chunk]
+            async with semaphore:
+                for attempt in range(self.batch_max_attempts):
+                    response = await self._invoke(
+                        'batch_write_item',
+                        RequestItems={self.table_name: requests}
+                    )
+                    requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                    if not requests:
+                        return {}
+                    if attempt + 1 < self.batch_max_attempts:
+                        await backoff(attempt)
+            return {
+                request['PutRequest']['Item']['id']['S']: "Unprocessed after retries"
+                for request in requests
+            }
+
+        async def write_chunk_safely(chunk):
+            try:
+                return await write_chunk(chunk)
+            except Exception as e:
+                return {item['id']: str(e) for item in chunk}
+
+        failed = {}
+        for result in await asyncio.gather(*(
+            write_chunk_safely(chunk) for chunk in chunked(items, BATCH_WRITE_LIMIT)
+        )):
+            failed.update(result)
+        return failed
+
+    async def batch_get_items(self, ids):
+        """Read items by id with BatchGetItem, 100 keys per call.
+
+        ``ids`` must not contain duplicates. ``UnprocessedKeys`` are retried
+        with backoff. Returns ``(found, failed)``: found items keyed by id and
+        a dict mapping ids that could not be read to the error message.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def read_chunk(chunk):
+            found = {}
+            request = {'Keys': [{'id': {'S': item_id}} for item_id in chunk]}
+            async with semaphore:
+                for attempt in range(self.batch_max_attempts):
+                    response = await self._invoke(
+                        'batch_get_item',
+                        RequestItems={self.table_name: request}
+                    )
+                    for item in response.get('Responses', {}).get(self.table_name, []):
+                        item = deserialize_item(item)
+                        found[item['id']] = item
+                    request = response.get('UnprocessedKeys', {}).get(self.table_name)
+                    if not request or not request.get('Keys'):
+                        return found, {}
+                    if attempt + 1 < self.batch_max_attempts:
+                        await backoff(attempt)
+            return found, {key['id']['S']: "Unprocessed after retries" for key in request['Keys']}
+
+        async def read_chunk_safely(chunk):
+            try:
+                return await read_chunk(chunk)
+            except Exception as e:
+                return {}, {item_id: str(e) for item_id in chunk}
+
+        found, failed = {}, {}
+        for chunk_found, chunk_failed in await asyncio.gather(*(
+            read_chunk_safely(chunk) for chunk in chunked(ids, BATCH_GET_LIMIT)
+        )):
+            found.update(chunk_found)
+            failed.update(chunk_failed)
+        return found, failed
+
+    async def parallel_scan(self, total_segments: int, page_size: int = 1000):
+        """Scan the whole table with ``total_segments`` concurrent segments.
+
+        Yields pages (lists of items) in the order they arrive from any
+        segment, so callers can stream results without holding the table in
+        memory. At most two pages per segment are buffered.
+        """
+        queue = asyncio.Queue(maxsize=total_segments * 2)
+        done = object()
+
+        async def scan_segment(segment):
+            try:
+                kwargs = {'Segment': segment, 'TotalSegments': total_segments, 'Limit': page_size}
+                while True:
+                    response = await self.scan(**kwargs)
+                    if response.get('Items'):
+                        await queue.put(response['Items'])
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+                await queue.put(done)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(scan_segment(segment)) for segment in range(total_segments)]
+        try:
+            remaining = total_segments
+            while remaining:
+                page = await queue.get()
+                if page is done:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
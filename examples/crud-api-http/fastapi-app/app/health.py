@@ -0,0 +1,106 @@
+"""Background DynamoDB health probing.
+
+Health checks arrive from the ALB and from ECS for every task, so ``/health``
+must not call DynamoDB itself. ``HealthProber`` probes on a fixed interval
+in a background task and keeps the latest result. The health endpoints only
+read that state. A probe that hangs counts as a failure after
+``timeout_seconds``. Readiness also expires if no probe has succeeded
+recently, so a stuck prober cannot keep reporting a stale success.
+"""
+import asyncio
+import os
+import time
+
+from .ids import utc_timestamp
+
+
+class HealthProber:
+    """Periodically await ``probe()`` and record latency and outcome.
+
+    The task is ready after a successful probe. It stays ready until
+    ``failure_threshold`` probes in a row fail, or until no probe has
+    succeeded for that many intervals.
+    """
+
+    def __init__(self, probe, interval_seconds: float, timeout_seconds: float, failure_threshold: int):
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self._task = None
+        self._last_success = None
+        self.last_success_at = None
+        self.last_latency_ms = None
+        self.last_error = None
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, probe) -> "HealthProber":
+        return cls(
+            probe,
+            interval_seconds=float(os.getenv('HEALTH_PROBE_INTERVAL_SECONDS', '5')),
+            timeout_seconds=float(os.getenv('HEALTH_PROBE_TIMEOUT_SECONDS', '2')),
+            failure_threshold=int(os.getenv('HEALTH_PROBE_FAILURE_THRESHOLD', '3')),
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def probe_once(self):
+        started = time.perf_counter()
+        self.probes += 1
+        try:
+            await asyncio.wait_for(self.probe(), self.timeout_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e) or type(e).__name__
+        else:
+            self._last_success = time.monotonic()
+            self.last_success_at = utc_timestamp()
+            self.consecutive_failures = 0
+            self.last_error = None
+        self.last_latency_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    @property
+    def alive(self) -> bool:
+        """False only if the probe loop itself has died"""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def ready(self) -> bool:
+        if self._last_success is None or self.consecutive_failures >= self.failure_threshold:
+            return False
+        max_age = self.interval_seconds * self.failure_threshold + self.timeout_seconds
+        return time.monotonic() - self._last_success <= max_age
+
+    def stats(self) -> dict:
+        return {
+            'ready': self.ready,
+            'last_success_at': self.last_success_at,
+            'last_latency_ms': self.last_latency_ms,
+            'last_error': self.last_error,
+            'consecutive_failures': self.consecutive_failures,
+            'probes': self.probes,
+            'failures': self.failures,
+            'interval_seconds': self.interval_seconds,
+        }
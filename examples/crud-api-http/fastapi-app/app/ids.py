@@ -0,0 +1,51 @@
+"""Time-sortable item identifiers and timestamps.
+
+Item IDs are ULIDs: a 48-bit millisecond timestamp followed by 80 random
+bits, written as 26 characters of Crockford base32. They sort in creation
+order as plain strings, so the newest items are at the end of any index
+keyed on the ID.
+
+Timestamps are fixed-width UTC ISO 8601 strings with microseconds
+(``2024-01-01T00:00:00.000000Z``), so they also compare correctly as
+strings, which is what a DynamoDB range condition on ``created_at`` does.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def new_item_id(timestamp_ms: Optional[int] = None) -> str:
+    """Generate a ULID for the given (default: current) time in milliseconds"""
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def utc_timestamp(moment: Optional[datetime] = None) -> str:
+    """Format a datetime (default: now) as a fixed-width UTC timestamp.
+
+    Naive datetimes are taken to be UTC.
+    """
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    elif moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def normalize_timestamp(value: str) -> str:
+    """Rewrite any ISO 8601 timestamp into the fixed-width UTC format.
+
+    Raises ``ValueError`` for strings that are not ISO 8601.
+    """
+    return utc_timestamp(datetime.fromisoformat(value.replace("Z", "+00:00")))
@@ -0,0 +1,88 @@
+"""Production entrypoint: ``python -m app.server``.
+
+Runs uvicorn with uvloop and httptools and one worker process per vCPU the
+container may use. The CPU count comes from the ECS task metadata (the task
+definition's ``cpu``), falling back to the cgroup quota and then the CPU
+affinity mask. ``os.cpu_count()`` alone would report the host's cores on
+Fargate, not the task's share.
+
+The keep-alive timeout must stay above the ALB idle timeout: if uvicorn
+closes an idle connection first, the ALB can send a request down it as it
+closes and answer the client with a 502.
+"""
+import json
+import math
+import os
+import urllib.request
+
+import uvicorn
+
+
+def ecs_task_cpus():
+    """vCPUs in the task definition, or None outside ECS"""
+    metadata_uri = os.getenv('ECS_CONTAINER_METADATA_URI_V4')
+    if not metadata_uri:
+        return None
+    try:
+        with urllib.request.urlopen(f"{metadata_uri}/task", timeout=1) as response:
+            return float(json.load(response)['Limits']['CPU']) or None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def cgroup_cpus():
+    """CPU quota of this container's cgroup (v2, then v1), or None if unlimited"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> float:
+    """CPUs this container can actually use"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limits = [limit for limit in (ecs_task_cpus(), cgroup_cpus()) if limit]
+    return min([cpus, *limits])
+
+
+def worker_count() -> int:
+    """`WEB_CONCURRENCY` if set, else one worker per whole available vCPU"""
+    configured = os.getenv('WEB_CONCURRENCY')
+    if configured:
+        return max(1, int(configured))
+    # Fractional tasks (0.25 / 0.5 vCPU) still get one worker
+    return max(1, math.floor(available_cpus()))
+
+
+def main():
+    uvicorn.run(
+        'app.main:app',
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '8000')),
+        workers=worker_count(),
+        loop='uvloop',
+        http='httptools',
+        # ALB idle timeout (60s by default) plus a margin
+        timeout_keep_alive=int(os.getenv('KEEP_ALIVE_TIMEOUT', '65')),
+        # Finish in-flight requests within the ALB deregistration delay
+        timeout_graceful_shutdown=int(os.getenv('GRACEFUL_SHUTDOWN_TIMEOUT', '25')),
+    )
+
+
+if __name__ == '__main__':
+    main()
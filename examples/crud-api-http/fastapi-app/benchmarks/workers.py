@@ -0,0 +1,91 @@
+"""Throughput of the production entrypoint against a single uvicorn process.
+
+Starts the app locally twice, once as the Dockerfile used to run it
+(``uvicorn app.main:app``: one process) and once through ``app.server`` (one
+worker per CPU), and drives the same loadtest.py workload against each.
+Both use uvloop and httptools: ``uvicorn[standard]`` installs them and
+uvicorn picks them by default, so the comparison isolates the worker count.
+
+The app needs a DynamoDB to talk to; DynamoDB Local keeps the database out
+of the measurement:
+
+    docker run -d -p 8001:8000 amazon/dynamodb-local
+    export DYNAMODB_ENDPOINT_URL=http://localhost:8001 DYNAMODB_TABLE_NAME=items AWS_REGION=us-east-1
+    aws dynamodb create-table --endpoint-url $DYNAMODB_ENDPOINT_URL --table-name items \\
+      --attribute-definitions AttributeName=id,AttributeType=S \\
+      --key-schema AttributeName=id,KeyType=HASH --billing-mode PAY_PER_REQUEST
+
+Then, from the fastapi-app directory with the app requirements and aiohttp
+installed:
+
+    python -m benchmarks.workers --workers 4 --concurrency 64 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from app.server import worker_count
+from benchmarks.loadtest import run
+
+
+def wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/openapi.json", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start within {timeout}s")
+
+
+def measure(command, env, args):
+    url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(command, env=env)
+    try:
+        wait_until_ready(url, process)
+        workload = argparse.Namespace(
+            url=url, concurrency=args.concurrency, duration=args.duration, tasks=1,
+            seed=args.seed, timeout=30, get_weight=80, list_weight=10,
+            create_weight=10, adjust_weight=0,
+        )
+        return asyncio.run(run(workload))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-process and multi-worker throughput")
+    parser.add_argument("--workers", type=int, default=worker_count(), help="Workers for app.server")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per run")
+    parser.add_argument("--seed", type=int, default=50, help="Items to create before each run")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PORT=str(args.port), WEB_CONCURRENCY=str(args.workers))
+    runs = {
+        "single": [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port)],
+        f"{args.workers} workers": [sys.executable, "-m", "app.server"],
+    }
+    results = {}
+    for name, command in runs.items():
+        print(f"== {name}")
+        results[name] = measure(command, env, args)
+        print("")
+
+    baseline = results["single"]
+    print(f"{'server':<14}{'req/s':>10}{'speedup':>10}")
+    for name, throughput in results.items():
+        print(f"{name:<14}{throughput:>10.1f}{throughput / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""DynamoDB Streams consumer that maintains item aggregates.
+
+Keeps one summary item in the stats table up to date as items change, so
+GET /items/stats never has to scan the items table:
+
+- item_count: number of items
+- inventory_value: sum of price * quantity
+- low_stock_count: items with quantity below LOW_STOCK_THRESHOLD
+
+Each item has a watermark holding the last applied stream sequence number
+and what the item currently contributes to the summary. A change adds the
+difference between the contribution of the item's latest image and the one
+in its watermark; an item without a watermark has not been counted yet, so
+items that existed before the stream was enabled are counted in full the
+first time they change (seed.py counts them up front). Records are folded
+per item, and each group of up to 99 items is written in one
+TransactWriteItems call: a single ADD on the summary plus the watermarks.
+Watermark writes are conditional on the watermark read before the
+transaction, so when Lambda retries or bisects a batch, records that were
+already applied are skipped instead of being counted twice.
+"""
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import boto3
+from botocore.exceptions import ClientError
+
+STATS_TABLE_NAME = os.environ['STATS_TABLE_NAME']
+LOW_STOCK_THRESHOLD = Decimal(os.getenv('LOW_STOCK_THRESHOLD', '10'))
+MAX_ATTEMPTS = int(os.getenv('MAX_ATTEMPTS', '5'))
+
+# Watermarks of deleted items only have to outlive the 24 hour stream retention
+WATERMARK_TTL_SECONDS = 2 * 24 * 3600
+
+# One watermark per item plus the summary update stay within the
+# 100 action limit of TransactWriteItems
+ITEMS_PER_TRANSACTION = 99
+
+SUMMARY_KEY = {'pk': {'S': 'summary'}}
+
+# Contribution of an item that is not counted
+NOTHING = (0, Decimal(0), 0)
+
+dynamodb = boto3.client('dynamodb')
+
+
+def backoff(attempt):
+    """Sleep with exponential backoff and full jitter"""
+    time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** attempt))))
+
+
+def sequence_key(record):
+    """Stream sequence number, zero-padded so it compares correctly as a string"""
+    return record['dynamodb']['SequenceNumber'].zfill(40)
+
+
+def contribution(image):
+    """(count, value, low_stock) that one item image adds to the summary"""
+    if not image:
+        return NOTHING
+    price = Decimal(image.get('price', {}).get('N', '0'))
+    quantity = Decimal(image.get('quantity', {}).get('N', '0'))
+    return 1, price * quantity, 1 if quantity < LOW_STOCK_THRESHOLD else 0
+
+
+def group_by_item(records):
+    """Group stream records by item id, each group in sequence order"""
+    changes = {}
+    for record in sorted(records, key=sequence_key):
+        item_id = record['dynamodb']['Keys']['id']['S']
+        changes.setdefault(item_id, []).append(record)
+    return changes
+
+
+def watermark_key(item_id):
+    return {'pk': {'S': f'item#{item_id}'}}
+
+
+def read_watermarks(item_ids):
+    """(last applied sequence number, counted contribution) per item id,
+    strongly consistent. The contribution is None in watermarks written
+    before it was stored.
+
+    UnprocessedKeys are retried with backoff, up to MAX_ATTEMPTS calls;
+    keys still unread after that fail the invocation, so Lambda retries
+    the batch.
+    """
+    watermarks = {}
+    request = {
+        STATS_TABLE_NAME: {
+            'Keys': [watermark_key(item_id) for item_id in item_ids],
+            'ConsistentRead': True,
+        }
+    }
+    for attempt in range(MAX_ATTEMPTS):
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response['Responses'].get(STATS_TABLE_NAME, []):
+            counted = None
+            if 'item_count' in item:
+                counted = (
+                    int(item['item_count']['N']),
+                    Decimal(item['inventory_value']['N']),
+                    int(item['low_stock_count']['N']),
+                )
+            watermarks[item['pk']['S'][len('item#'):]] = (item['last_sequence']['S'], counted)
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return watermarks
+        if attempt + 1 < MAX_ATTEMPTS:
+            backoff(attempt)
+    unread = len(request[STATS_TABLE_NAME]['Keys'])
+    raise RuntimeError(f"{unread} watermarks unprocessed after {MAX_ATTEMPTS} attempts")
+
+
+def watermark_update(item_id, sequence, previous, counted, removed=False):
+    count, value, low_stock = counted
+    values = {
+        ':sequence': {'S': sequence},
+        ':count': {'N': str(count)},
+        ':value': {'N': str(value)},
+        ':low_stock': {'N': str(low_stock)},
+    }
+    if previous is None:
+        condition = 'attribute_not_exists(pk)'
+    else:
+        condition = 'last_sequence = :previous'
+        values[':previous'] = {'S': previous}
+
+    update = (
+        'SET last_sequence = :sequence, item_count = :count, '
+        'inventory_value = :value, low_stock_count = :low_stock'
+    )
+    if removed:
+        update += ', expires_at = :expires_at'
+        values[':expires_at'] = {'N': str(int(time.time()) + WATERMARK_TTL_SECONDS)}
+    else:
+        update += ' REMOVE expires_at'
+
+    return {
+        'Update': {
+            'TableName': STATS_TABLE_NAME,
+            'Key': watermark_key(item_id),
+            'UpdateExpression': update,
+            'ConditionExpression': condition,
+            'ExpressionAttributeValues': values,
+        }
+    }
+
+
+def summary_update(count, value, low_stock):
+    return {
+        'Update': {
+            'TableName': STATS_TABLE_NAME,
+            'Key': SUMMARY_KEY,
+            'UpdateExpression': (
+                'ADD item_count :count, inventory_value :value, low_stock_count :low_stock '
+                'SET low_stock_threshold = :threshold, updated_at = :updated_at'
+            ),
+            'ExpressionAttributeValues': {
+                ':count': {'N': str(count)},
+                ':value': {'N': str(value)},
+                ':low_stock': {'N': str(low_stock)},
+                ':threshold': {'N': str(LOW_STOCK_THRESHOLD)},
+                ':updated_at': {'S': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')},
+            },
+        }
+    }
+
+
+def transact(item_ids, plan):
+    """Read the watermarks of `item_ids` and write the (watermark actions,
+    summary delta) that `plan(watermarks)` returns in one transaction.
+
+    A cancelled transaction wrote nothing: the watermarks are read again
+    (another invocation may have written some of them) and the plan is
+    redone. Returns the number of watermarks written.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        actions, totals = plan(read_watermarks(item_ids))
+        if not actions:
+            return 0
+        actions.append(summary_update(*totals))
+
+        try:
+            dynamodb.transact_write_items(TransactItems=actions)
+            return len(actions) - 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException' or attempt + 1 == MAX_ATTEMPTS:
+                raise
+            backoff(attempt)
+
+
+def apply_changes(changes):
+    """Apply the folded changes of up to ITEMS_PER_TRANSACTION items.
+
+    Returns the number of watermarks written. Items whose records are all at
+    or below their watermark, or whose counted contribution did not change,
+    are not written at all.
+    """
+    def plan(watermarks):
+        actions = []
+        totals = NOTHING
+        for item_id, records in changes.items():
+            previous, counted = watermarks.get(item_id, (None, NOTHING))
+            pending = [r for r in records if previous is None or sequence_key(r) > previous]
+            if not pending:
+                continue
+            if counted is None:
+                # Older watermark without a contribution: the old image of
+                # the first pending record is what was counted
+                counted = contribution(pending[0]['dynamodb'].get('OldImage'))
+            new = contribution(pending[-1]['dynamodb'].get('NewImage'))
+            delta = tuple(n - c for n, c in zip(new, counted))
+            if not any(delta) and previous is not None:
+                # Without a watermark, write one anyway: it tells seed.py
+                # the item is accounted for (e.g. removed before counted)
+                continue
+            totals = tuple(t + d for t, d in zip(totals, delta))
+            actions.append(watermark_update(
+                item_id, sequence_key(pending[-1]), previous, new,
+                removed=pending[-1]['eventName'] == 'REMOVE',
+            ))
+        return actions, totals
+
+    return transact(list(changes), plan)
+
+
+def handler(event, context):
+    """Fold a stream batch into the summary item"""
+    records = [r for r in event['Records'] if r.get('eventSource') == 'aws:dynamodb']
+    changes = group_by_item(records)
+    item_ids = list(changes)
+
+    applied = 0
+    for start in range(0, len(item_ids), ITEMS_PER_TRANSACTION):
+        chunk = item_ids[start:start + ITEMS_PER_TRANSACTION]
+        applied += apply_changes({item_id: changes[item_id] for item_id in chunk})
+
+    print(json.dumps({'records': len(records), 'items': len(item_ids), 'applied': applied}))
+    return {'records': len(records), 'applied': applied}
@@ -16,6 +16,48 @@ variable "enable_waf" {
   default     = false
 }
 
+variable "item_cache_max_size" {
+  description = "Maximum items held in each task's in-process read cache (0 disables it)"
+  type        = number
+  default     = 1000
+}
+
+variable "item_cache_ttl_seconds" {
+  description = "Seconds a cached item is served before it is read again from DynamoDB"
+  type        = number
+  default     = 5
+}
+
+variable "low_stock_threshold" {
+  description = "Quantity below which an item counts as low stock in GET /items/stats"
+  type        = number
+  default     = 10
+}
+
+variable "idempotency_ttl_seconds" {
+  description = "Seconds a POST /items response is replayed for retries with the same Idempotency-Key"
+  type        = number
+  default     = 86400
+}
+
+variable "task_cpu" {
+  description = "CPU units for the API task; the server runs one worker per whole vCPU"
+  type        = string
+  default     = "256"
+}
+
+variable "task_memory" {
+  description = "Memory (MiB) for the API task"
+  type        = string
+  default     = "512"
+}
+
+variable "alb_idle_timeout" {
+  description = "ALB idle timeout in seconds; the server keeps connections open 5 seconds longer"
+  type        = number
+  default     = 60
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
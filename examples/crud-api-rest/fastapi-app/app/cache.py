@@ -0,0 +1,117 @@
+"""In-process read-through cache for item lookups.
+
+Each ECS task (and each worker process) holds its own cache, so entries can
+be stale for up to the TTL after a write handled by another process. Keep
+the TTL short for data that changes often.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+
+class ItemCache:
+    """Bounded LRU cache with a per-entry TTL and request coalescing.
+
+    Concurrent misses on the same key share a single load. The load runs in
+    its own task, so a client disconnecting does not cancel it for the other
+    waiters. ``invalidate()`` drops both the entry and any in-flight load, so
+    a load that started before a write never repopulates the cache.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "ItemCache":
+        return cls(
+            max_size=int(os.getenv('ITEM_CACHE_MAX_SIZE', '1000')),
+            ttl_seconds=float(os.getenv('ITEM_CACHE_TTL_SECONDS', '5')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    async def get_or_load(self, key, loader):
+        """Return the cached value for ``key`` or await ``loader()`` once for
+        all concurrent callers and cache its result (including ``None``)"""
+        if not self.enabled:
+            return await loader()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        finally:
+            current = self._inflight.get(key) is task
+            if current:
+                del self._inflight[key]
+        if current:
+            self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        """Forget ``key`` after a write"""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _consume_exception(task):
+    # Loader errors reach every waiter through shield(); mark them retrieved
+    # so a load whose callers all went away does not log a warning.
+    if not task.cancelled():
+        task.exception()
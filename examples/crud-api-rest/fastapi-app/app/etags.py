@@ -0,0 +1,67 @@
+"""Distinct strong ETags for compressed representations.
+
+``BrotliMiddleware`` compresses a response without touching its ETag, so
+the identity, br and gzip bodies would share one strong validator although
+their bytes differ. ``EncodingETagMiddleware`` sits outside it and appends
+the content coding to the ETag of compressed responses (``"3"`` becomes
+``"3-br"``). On the way in it strips the suffix from ``If-None-Match`` and
+``If-Match``, so the routes keep comparing against the plain item version
+or body hash, and a 304 answering a suffixed tag echoes that tag.
+"""
+from starlette.datastructures import MutableHeaders
+
+CONDITIONAL_HEADERS = (b'if-none-match', b'if-match')
+
+def with_encoding(etag: str, encoding: str) -> str:
+    """`"3"` with coding `br` becomes `"3-br"`; W/ prefixes are kept"""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def strip_encodings(header: str, known: dict) -> str:
+    """Remove coding suffixes from a list of entity tags, recording each
+    stripped tag (as a strong tag) under its plain form in `known`"""
+    tags = []
+    for tag in header.split(','):
+        tag = tag.strip()
+        base, _, encoding = tag[:-1].rpartition('-') if tag.endswith('"') else ('', '', '')
+        if base and encoding in ('br', 'gzip'):
+            plain = f'{base}"'
+            known[plain.removeprefix('W/')] = tag.removeprefix('W/')
+            tag = plain
+        tags.append(tag)
+    return ', '.join(tags)
+
+class EncodingETagMiddleware:
+    """ASGI middleware giving each content coding its own ETag"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        known = {}
+        headers = []
+        for name, value in scope['headers']:
+            if name in CONDITIONAL_HEADERS:
+                value = strip_encodings(value.decode('latin-1'), known).encode('latin-1')
+            headers.append((name, value))
+        # In place: outer middleware (DynamoDBUsageMiddleware) reads the
+        # endpoint the router sets on this same scope
+        scope['headers'] = headers
+
+        async def send_with_etag(message):
+            if message['type'] == 'http.response.start':
+                response_headers = MutableHeaders(scope=message)
+                etag = response_headers.get('etag')
+                encoding = response_headers.get('content-encoding')
+                if etag and encoding:
+                    response_headers['etag'] = with_encoding(etag, encoding)
+                elif etag and message['status'] == 304 and etag in known:
+                    response_headers['etag'] = known[etag]
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
@@ -1,14 +1,77 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from brotli_asgi import BrotliMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional
-import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from typing import List, Optional, Union
+from contextlib import asynccontextmanager
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import orjson
 import os
-import uuid
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+
+from .cache import ItemCache
+from .ids import new_item_id, utc_timestamp
+from .db import (
+    CREATED_INDEX,
+    ITEM_ENTITY_TYPE,
+    NAME_INDEX,
+    PRICE_INDEX,
+    QUANTITY_INDEX,
+    ItemsTable,
+    decode_page_token,
+    encode_page_token,
+)
+from .etags import EncodingETagMiddleware
+from .health import HealthProber
+from .metrics import DynamoDBUsageMiddleware, RouteMetrics
+
+# Maximum items accepted by the batch endpoints per request
+MAX_BATCH_SIZE = 1000
+
+# Upper bound for parallel scan segments on /items/export
+MAX_EXPORT_SEGMENTS = 32
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+# Clients may cache GET responses but must revalidate them (ETag / Last-Modified)
+REVALIDATE = "private, no-cache"
+
+# DynamoDB data layer (async, pooled connections)
+db = ItemsTable.from_env()
+
+# Read-through cache for GET /items/{item_id}
+item_cache = ItemCache.from_env()
+
+# How long a stored Idempotency-Key response is replayed
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+
+# Front cache for idempotent responses, so a retry that lands on the task
+# that handled the first request is answered without calling DynamoDB
+idempotency_cache = ItemCache(
+    max_size=int(os.getenv('IDEMPOTENCY_CACHE_MAX_SIZE', '10000')),
+    ttl_seconds=min(IDEMPOTENCY_TTL_SECONDS, float(os.getenv('IDEMPOTENCY_CACHE_TTL_SECONDS', '300'))),
+)
+
+# DynamoDB calls, time and consumed capacity per route
+route_metrics = RouteMetrics()
+
+# Probes DynamoDB in the background; the health endpoints report its state
+health = HealthProber.from_env(db.ping)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the DynamoDB connection pool and start the health prober on
+    startup; stop both on shutdown"""
+    await db.connect()
+    health.start()
+    yield
+    await health.stop()
+    await db.close()
 
 # Initialize FastAPI
 app = FastAPI(
@@ -17,7 +80,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -27,12 +91,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Token", "X-DynamoDB-Consumed-Capacity", "Server-Timing", "Idempotent-Replayed"],
+)
+
+# br or gzip, negotiated from Accept-Encoding
+app.add_middleware(
+    BrotliMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_fallback=True,
 )
 
-# DynamoDB client
-dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-table_name = os.getenv('DYNAMODB_TABLE_NAME', 'items')
-table = dynamodb.Table(table_name)
+# Compressed responses get their own ETag ("3-br"); runs outside compression
+app.add_middleware(EncodingETagMiddleware)
+
+# X-DynamoDB-Consumed-Capacity / Server-Timing headers and per-route metrics
+app.add_middleware(DynamoDBUsageMiddleware, route_metrics=route_metrics)
 
 # Pydantic models
 class ItemBase(BaseModel):
@@ -50,10 +123,14 @@ class ItemUpdate(BaseModel):
     price: Optional[float] = Field(None, gt=0)
     quantity: Optional[int] = Field(None, ge=0)
 
+class QuantityAdjust(BaseModel):
+    delta: int = Field(..., description="Amount to add to the quantity; negative to take stock out")
+
 class Item(ItemBase):
     id: str = Field(..., description="Item ID")
     created_at: str = Field(..., description="Creation timestamp")
     updated_at: str = Field(..., description="Last update timestamp")
+    version: Optional[int] = Field(None, description="Incremented on every update; returned as the ETag")
 
     class Config:
         json_schema_extra = {
@@ -64,178 +141,820 @@ class Item(ItemBase):
                 "price": 29.99,
                 "quantity": 100,
                 "created_at": "2024-01-01T00:00:00Z",
-                "updated_at": "2024-01-01T00:00:00Z"
+                "updated_at": "2024-01-01T00:00:00Z",
+                "version": 1
             }
         }
 
-# Health check
-@app.get("/health", tags=["Health"])
-async def health_check():
-    """Health check endpoint"""
+class PartialItem(BaseModel):
+    """Item restricted to the attributes requested with `fields`"""
+    id: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    version: Optional[int] = None
+
+class BatchCreateRequest(BaseModel):
+    items: List[ItemCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchCreateResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    status: str = Field(..., description="created or failed")
+    item: Optional[Item] = None
+    error: Optional[str] = None
+
+class BatchCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchCreateResult]
+
+class BatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchGetResult(BaseModel):
+    id: str
+    status: str = Field(..., description="found, not_found or failed")
+    item: Optional[Item] = None
+    error: Optional[str] = None
+
+class BatchGetResponse(BaseModel):
+    found: int
+    not_found: int
+    failed: int
+    results: List[BatchGetResult]
+
+class ItemStats(BaseModel):
+    item_count: int
+    inventory_value: float = Field(..., description="Sum of price * quantity")
+    low_stock_count: int = Field(..., description="Items with quantity below low_stock_threshold")
+    low_stock_threshold: Optional[int] = None
+    updated_at: Optional[str] = None
+
+def new_item_data(item: ItemCreate) -> dict:
+    """Build the DynamoDB record for a new item"""
+    timestamp = utc_timestamp()
+
+    return {
+        "id": new_item_id(),
+        **item.model_dump(),
+        "entity_type": ITEM_ENTITY_TYPE,
+        "name_lower": item.name.lower(),
+        "created_at": timestamp,
+        "updated_at": timestamp,
+        "version": 1
+    }
+
+def range_condition(low, high) -> str:
+    """Sort key condition on #sk for an optional [low, high] range"""
+    if low is not None and high is not None:
+        if low > high:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Range minimum must not exceed the maximum"
+            )
+        return "#sk BETWEEN :low AND :high"
+    return "#sk >= :low" if low is not None else "#sk <= :high"
+
+def index_query(
+    name_prefix: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_quantity: Optional[int],
+    max_quantity: Optional[int],
+    created_after: Optional[datetime] = None
+) -> Optional[dict]:
+    """Build Query arguments for the filters on GET /items.
+
+    Returns None when no filter is set (plain paged scan). Each filter maps
+    to exactly one GSI, so combining filters is rejected instead of being
+    answered with a scan.
+    """
+    requested = [
+        index for index, used in (
+            (NAME_INDEX, name_prefix is not None),
+            (PRICE_INDEX, min_price is not None or max_price is not None),
+            (QUANTITY_INDEX, min_quantity is not None or max_quantity is not None),
+            (CREATED_INDEX, created_after is not None),
+        ) if used
+    ]
+    if not requested:
+        return None
+    if len(requested) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Filter by only one of name_prefix, min_price/max_price, "
+                   "min_quantity/max_quantity or created_after; combining them would "
+                   "require a table scan"
+        )
+
+    index = requested[0]
+    values = {":pk": ITEM_ENTITY_TYPE}
+    if index == NAME_INDEX:
+        sort_key = "name_lower"
+        condition = "begins_with(#sk, :prefix)"
+        values[":prefix"] = name_prefix.lower()
+    elif index == CREATED_INDEX:
+        sort_key = "created_at"
+        condition = "#sk > :after"
+        values[":after"] = utc_timestamp(created_after)
+    else:
+        sort_key, low, high = (
+            ("price", min_price, max_price) if index == PRICE_INDEX
+            else ("quantity", min_quantity, max_quantity)
+        )
+        condition = range_condition(low, high)
+        if low is not None:
+            values[":low"] = low
+        if high is not None:
+            values[":high"] = high
+
+    return {
+        "IndexName": index,
+        "KeyConditionExpression": f"#pk = :pk AND {condition}",
+        "ExpressionAttributeNames": {"#pk": "entity_type", "#sk": sort_key},
+        "ExpressionAttributeValues": values
+    }
+
+def missing_index(error: ClientError) -> bool:
+    return (
+        error.response.get('Error', {}).get('Code') == 'ValidationException'
+        and 'specified index' in error.response.get('Error', {}).get('Message', '')
+    )
+
+def item_etag(version) -> Optional[str]:
+    """Strong ETag for an item, derived from its version"""
+    if version is None:
+        return None
+    return f'"{version}"'
+
+def http_date(timestamp: Optional[str]) -> Optional[str]:
+    """Format an ISO 8601 timestamp such as `updated_at` as an HTTP date.
+
+    HTTP dates have one-second resolution, so a timestamp less than a second
+    old gives None: a second update within the same second would carry the
+    same Last-Modified, and If-Modified-Since would report the item as
+    unchanged (RFC 9110 section 8.8.2.2). The ETag still validates it.
+    """
+    if not timestamp:
+        return None
     try:
-        # Test DynamoDB connection
-        table.table_status
-        return {"status": "healthy", "service": "items-api", "dynamodb": "connected"}
-    except Exception as e:
-        return JSONResponse(
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if (datetime.now(timezone.utc) - parsed).total_seconds() < 1:
+        return None
+    return format_datetime(parsed.astimezone(timezone.utc), usegmt=True)
+
+def item_headers(item: dict) -> dict:
+    """Validators for one item: ETag from its version, Last-Modified from updated_at"""
+    headers = {}
+    etag = item_etag(item.get('version'))
+    if etag:
+        headers["ETag"] = etag
+    last_modified = http_date(item.get('updated_at'))
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+def item_json(item: dict, status_code: int = status.HTTP_200_OK) -> ORJSONResponse:
+    """Respond with one item and its ETag / Last-Modified"""
+    return ORJSONResponse(item, status_code=status_code, headers=item_headers(item))
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for a rendered response body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: Optional[str],
+    last_modified: Optional[str] = None
+) -> bool:
+    """Whether the client's cached copy is current (RFC 9110 section 13.2.2).
+
+    If-None-Match takes precedence and uses weak comparison; If-Modified-Since
+    is only consulted when If-None-Match is absent.
+    """
+    if if_none_match is not None:
+        if not etag:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
+
+def parse_if_match(if_match: Optional[str]) -> Optional[List[int]]:
+    """Parse an If-Match header into the item versions it accepts.
+
+    Returns None when any existing item is acceptable (no header or `*`).
+    Weak or malformed tags never match, as If-Match uses strong comparison.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    if not versions:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="If-Match does not match any item version"
+        )
+    return versions
+
+def write_condition(versions: Optional[List[int]]):
+    """Condition for a single-round-trip write: the item must exist and,
+    when If-Match was sent, be at one of the expected versions"""
+    condition = "attribute_exists(#id)"
+    names = {"#id": "id"}
+    values = {}
+    if versions is not None:
+        placeholders = [f":expected{i}" for i in range(len(versions))]
+        condition += f" AND #version IN ({', '.join(placeholders)})"
+        names["#version"] = "version"
+        values.update(zip(placeholders, versions))
+    return condition, names, values
+
+def precondition_failed(item_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"Item with id {item_id} was modified (If-Match failed)"
+    )
+
+def condition_failure(error: ClientError, item_id: str) -> HTTPException:
+    """Map a failed conditional write to 404/412 without an extra read.
+
+    With ReturnValuesOnConditionCheckFailure=ALL_OLD DynamoDB returns the
+    current item when it exists, so a missing `Item` means 404.
+    """
+    if error.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"DynamoDB request failed: {str(error)}"
+        )
+    if 'Item' in error.response:
+        return precondition_failed(item_id)
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Item with id {item_id} not found"
+    )
+
+ITEM_FIELDS = tuple(Item.model_fields)
+
+FIELDS_DESCRIPTION = f"Comma-separated attributes to return (of {', '.join(ITEM_FIELDS)})"
+
+def item_response(record: dict, fields=ITEM_FIELDS) -> dict:
+    """Shape a deserialized DynamoDB record into the `Item` response body.
+
+    Records from `db` already hold JSON-ready types, so this only picks the
+    public fields; handlers return the result through ORJSONResponse, which
+    skips a second round of Pydantic validation via `response_model`.
+    """
+    item = {field: record.get(field) for field in fields}
+    if item.get('price') is not None:
+        item['price'] = float(item['price'])
+    return item
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple]:
+    """Parse the `fields` query parameter; None means the full item"""
+    if fields is None:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in ITEM_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}; "
+                   f"choose from {', '.join(ITEM_FIELDS)}"
+        )
+    return selected
+
+def projection(fields, names: Optional[dict] = None) -> dict:
+    """ProjectionExpression arguments reading only `fields`, merged with any
+    ExpressionAttributeNames the request already uses"""
+    return {
+        "ProjectionExpression": ", ".join(f"#f_{field}" for field in fields),
+        "ExpressionAttributeNames": {**(names or {}), **{f"#f_{field}": field for field in fields}}
+    }
+
+# Health checks: answered from the background prober's state, no DynamoDB call
+@app.get("/health", tags=["Health"], responses={503: {"description": "DynamoDB unreachable"}})
+async def health_check():
+    """Readiness, kept at the original path for existing ALB health checks"""
+    return await readiness()
+
+@app.get("/health/live", tags=["Health"], responses={503: {"description": "Health prober stopped"}})
+async def liveness():
+    """Liveness: the process is serving requests and the prober is running.
+
+    Does not depend on DynamoDB, so an outage does not get tasks restarted.
+    """
+    if not health.alive:
+        return ORJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "dead"})
+    return ORJSONResponse({"status": "alive"})
+
+@app.get("/health/ready", tags=["Health"], responses={503: {"description": "DynamoDB unreachable"}})
+async def readiness():
+    """Readiness: the last DynamoDB probe succeeded recently.
+
+    Reports probe latency, last success and the latest error.
+    """
+    probe = health.stats()
+    if not probe['ready']:
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            content={"status": "unhealthy", "error": str(e)}
+            content={"status": "unhealthy", "service": "items-api", "dynamodb": probe},
         )
+    return ORJSONResponse({"status": "healthy", "service": "items-api", "dynamodb": probe})
 
 # Create item
-@app.post("/items", response_model=Item, status_code=status.HTTP_201_CREATED, tags=["Items"])
-async def create_item(item: ItemCreate):
-    """Create a new item"""
+@app.post("/items", response_model=Item, status_code=status.HTTP_201_CREATED, tags=["Items"], responses={
+    422: {"description": "Idempotency-Key reused with a different request body"}
+})
+async def create_item(item: ItemCreate, idempotency_key: Optional[str] = Header(None, max_length=255)):
+    """Create a new item.
+
+    Send a unique `Idempotency-Key` header to make retries safe: the first
+    response is stored (for IDEMPOTENCY_TTL_SECONDS) together with the item
+    in one transaction, and a retry with the same key and body gets that
+    201 replayed with `Idempotent-Replayed: true` instead of a second item.
+    """
+    if idempotency_key and db.idempotency_table_name:
+        return await create_item_once(item, idempotency_key)
+
     try:
-        item_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().isoformat() + "Z"
+        item_data = new_item_data(item)
+        await db.put_item(Item=item_data)
+        item_cache.invalidate(item_data['id'])
 
-        item_dict = item.model_dump()
-        item_dict['price'] = Decimal(str(item_dict['price']))
+        return item_json(item_response(item_data), status_code=status.HTTP_201_CREATED)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create item: {str(e)}"
+        )
 
-        item_data = {
-            "id": item_id,
-            **item_dict,
-            "created_at": timestamp,
-            "updated_at": timestamp
+def request_fingerprint(item: ItemCreate) -> str:
+    return hashlib.sha256(orjson.dumps(item.model_dump(), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+async def create_item_once(item: ItemCreate, idempotency_key: str):
+    """Create an item at most once per Idempotency-Key and replay the first response"""
+    key = f"POST /items#{idempotency_key}"
+    fingerprint = request_fingerprint(item)
+    attempt = object()
+
+    async def create_or_fetch():
+        item_data = new_item_data(item)
+        record = {
+            "pk": key,
+            "fingerprint": fingerprint,
+            "status": status.HTTP_201_CREATED,
+            "body": orjson.dumps(item_response(item_data)).decode(),
+            "expires_at": int(time.time()) + IDEMPOTENCY_TTL_SECONDS
         }
+        existing = await db.put_item_once(item_data, record)
+        if existing is not None:
+            return existing, None
+        item_cache.invalidate(item_data['id'])
+        return record, attempt
 
-        table.put_item(Item=item_data)
-
-        # Convert Decimal back to float for response
-        item_data['price'] = float(item_data['price'])
-        return Item(**item_data)
+    try:
+        record, created_by = await idempotency_cache.get_or_load(key, create_or_fetch)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create item: {str(e)}"
         )
 
-# Get all items
-@app.get("/items", response_model=List[Item], tags=["Items"])
-async def list_items(limit: int = 100, last_key: Optional[str] = None):
-    """List all items with pagination"""
-    try:
-        scan_kwargs = {"Limit": min(limit, 100)}
+    if record["fingerprint"] != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
 
-        if last_key:
-            scan_kwargs["ExclusiveStartKey"] = {"id": last_key}
+    response = item_json(orjson.loads(record["body"]), status_code=record["status"])
+    if created_by is not attempt:
+        response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+# Batch create items
+@app.post("/items/batch-create", response_model=BatchCreateResponse, status_code=status.HTTP_201_CREATED, tags=["Items"])
+async def batch_create_items(request: BatchCreateRequest):
+    """Create up to 1000 items with BatchWriteItem.
+
+    Returns 201 when every item was written and 207 with per-item results
+    when some were not.
+    """
+    records = [new_item_data(item) for item in request.items]
+    failed = await db.batch_put_items(records)
+    for record in records:
+        item_cache.invalidate(record['id'])
+
+    results = []
+    for index, record in enumerate(records):
+        if record['id'] in failed:
+            results.append({"index": index, "status": "failed", "item": None, "error": failed[record['id']]})
+        else:
+            results.append({"index": index, "status": "created", "item": item_response(record), "error": None})
+
+    return ORJSONResponse(
+        {"created": len(records) - len(failed), "failed": len(failed), "results": results},
+        status_code=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_201_CREATED
+    )
+
+# Batch get items
+@app.post("/items/batch-get", response_model=BatchGetResponse, tags=["Items"])
+async def batch_get_items(request: BatchGetRequest):
+    """Get up to 1000 items by ID with BatchGetItem. Results follow request order."""
+    ids = list(dict.fromkeys(request.ids))
+    found, failed = await db.batch_get_items(ids)
+
+    results = []
+    for item_id in ids:
+        if item_id in found:
+            results.append({"id": item_id, "status": "found", "item": item_response(found[item_id]), "error": None})
+        elif item_id in failed:
+            results.append({"id": item_id, "status": "failed", "item": None, "error": failed[item_id]})
+        else:
+            results.append({"id": item_id, "status": "not_found", "item": None, "error": None})
+
+    return ORJSONResponse({
+        "found": len(found),
+        "not_found": len(ids) - len(found) - len(failed),
+        "failed": len(failed),
+        "results": results
+    })
 
-        response = table.scan(**scan_kwargs)
-        items = []
-        for item in response.get('Items', []):
-            if 'price' in item and isinstance(item['price'], Decimal):
-                item['price'] = float(item['price'])
-            items.append(Item(**item))
+# Get all items
+@app.get("/items", response_model=List[Union[Item, PartialItem]], tags=["Items"])
+async def list_items(
+    limit: int = 100,
+    next_token: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100, description="Case-insensitive name prefix (name-index)"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price (price-index)"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price (price-index)"),
+    min_quantity: Optional[int] = Query(None, ge=0, description="Minimum quantity (quantity-index)"),
+    max_quantity: Optional[int] = Query(None, ge=0, description="Maximum quantity (quantity-index)"),
+    created_after: Optional[datetime] = Query(None, description="Only items created after this ISO 8601 time (created-index)"),
+    descending: bool = Query(False, description="Reverse index order (filters only)"),
+    last_key: Optional[str] = Query(None, deprecated=True, description="Use next_token"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """List items one page at a time.
+
+    Without filters this is a paged scan. `name_prefix`, `min_price`/`max_price`,
+    `min_quantity`/`max_quantity` and `created_after` each run a `Query`
+    against their GSI, in index order; only one filter may be used per
+    request. `created_after` with `descending=true` lists the newest first.
+
+    When more items remain, the `X-Next-Token` response header holds an
+    opaque token; pass it back as `next_token` to fetch the next page.
+
+    `fields=id,name,price` returns only those attributes; DynamoDB applies
+    the projection, so less data is transferred and serialized.
+
+    The page carries an ETag computed from its body; send it back in
+    `If-None-Match` to get 304 Not Modified when the page is unchanged.
+    """
+    selected = parse_fields(fields)
+    query_kwargs = index_query(name_prefix, min_price, max_price, min_quantity, max_quantity, created_after)
+    request_kwargs = query_kwargs or {}
+    request_kwargs["Limit"] = max(1, min(limit, 100))
+    if selected:
+        request_kwargs.update(projection(selected, request_kwargs.get("ExpressionAttributeNames")))
+    if query_kwargs:
+        request_kwargs["ScanIndexForward"] = not descending
+
+    if next_token:
+        try:
+            request_kwargs["ExclusiveStartKey"] = decode_page_token(next_token)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    elif last_key:
+        request_kwargs["ExclusiveStartKey"] = {"id": last_key}
 
-        return items
+    try:
+        if query_kwargs:
+            result = await db.query(**request_kwargs)
+        else:
+            result = await db.scan(**request_kwargs)
+        body = orjson.dumps([item_response(item, selected or ITEM_FIELDS) for item in result.get('Items', [])])
+
+        headers = {"ETag": body_etag(body), "Cache-Control": REVALIDATE}
+        if 'LastEvaluatedKey' in result:
+            headers["X-Next-Token"] = encode_page_token(result['LastEvaluatedKey'])
+
+        if not_modified(if_none_match, None, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+    except ClientError as e:
+        if query_kwargs and missing_index(e):
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail=f"Index {query_kwargs['IndexName']} does not exist on the items table; "
+                       "apply the Terraform global_secondary_indexes to enable this filter"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list items: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to list items: {str(e)}"
         )
 
-# Get item by ID
-@app.get("/items/{item_id}", response_model=Item, tags=["Items"])
-async def get_item(item_id: str):
-    """Get a specific item by ID"""
+# Export all items
+@app.get("/items/export", tags=["Items"], response_class=StreamingResponse, responses={
+    200: {"content": {"application/x-ndjson": {}}, "description": "One JSON item per line"}
+})
+async def export_items(segments: int = Query(4, ge=1, le=MAX_EXPORT_SEGMENTS)):
+    """Export every item as NDJSON using a parallel segmented scan.
+
+    Lines are streamed as soon as any segment returns a page, so memory use
+    stays flat regardless of table size.
+    """
+    async def ndjson():
+        async for page in db.parallel_scan(segments):
+            yield b"".join(orjson.dumps(item_response(item)) + b"\n" for item in page)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+# Item aggregates
+@app.get("/items/stats", response_model=ItemStats, tags=["Items"])
+async def item_stats():
+    """Item count, inventory value and low-stock count.
+
+    Reads a single summary item kept up to date by the stream processor from
+    the table's DynamoDB stream, so the cost does not grow with the table.
+    Values lag writes by the stream delay (typically under a second).
+    """
     try:
-        response = table.get_item(Key={"id": item_id})
+        stats = await db.item_stats()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read item stats: {str(e)}"
+        )
 
-        if 'Item' not in response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Item with id {item_id} not found"
-            )
+    if stats is None and not db.stats_table_name:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="STATS_TABLE_NAME is not configured"
+        )
+    stats = stats or {}
+    return ORJSONResponse({
+        "item_count": stats.get("item_count", 0),
+        "inventory_value": float(stats.get("inventory_value", 0)),
+        "low_stock_count": stats.get("low_stock_count", 0),
+        "low_stock_threshold": stats.get("low_stock_threshold"),
+        "updated_at": stats.get("updated_at")
+    })
 
-        item = response['Item']
-        if 'price' in item and isinstance(item['price'], Decimal):
-            item['price'] = float(item['price'])
+# Get item by ID
+@app.get("/items/{item_id}", response_model=Union[Item, PartialItem], tags=["Items"])
+async def get_item(
+    item_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
+):
+    """Get a specific item by ID (served from the in-process cache when fresh).
+
+    `fields` limits the response to the named attributes. With the cache
+    enabled the full item is cached and trimmed per request; otherwise the
+    read itself uses a ProjectionExpression.
+
+    Returns 304 Not Modified when `If-None-Match` matches the item's ETag or,
+    without it, when the item is unchanged since `If-Modified-Since`.
+    Partial responses carry an ETag of their own body.
+    """
+    selected = parse_fields(fields)
+
+    async def load_item():
+        result = await db.get_item(Key={"id": item_id})
+        return item_response(result['Item']) if 'Item' in result else None
 
-        return Item(**item)
-    except HTTPException:
-        raise
+    try:
+        if selected and not item_cache.enabled:
+            # updated_at is read as well to send Last-Modified
+            result = await db.get_item(
+                Key={"id": item_id},
+                **projection(tuple(dict.fromkeys(selected + ("updated_at",))))
+            )
+            item = result.get('Item')
+        else:
+            item = await item_cache.get_or_load(item_id, load_item)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get item: {str(e)}"
         )
 
+    if item is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item with id {item_id} not found"
+        )
+
+    if selected:
+        body = orjson.dumps(item_response(item, selected))
+        headers = {"ETag": body_etag(body)}
+        last_modified = http_date(item.get('updated_at'))
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+    else:
+        body = orjson.dumps(item)
+        headers = item_headers(item)
+    headers["Cache-Control"] = REVALIDATE
+
+    if not_modified(if_none_match, if_modified_since, headers.get("ETag"), headers.get("Last-Modified")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
 # Update item
 @app.put("/items/{item_id}", response_model=Item, tags=["Items"])
-async def update_item(item_id: str, item_update: ItemUpdate):
-    """Update an existing item"""
+async def update_item(item_id: str, item_update: ItemUpdate, if_match: Optional[str] = Header(None)):
+    """Update an existing item.
+
+    Uses a single conditional write. Send the item's ETag in `If-Match` to
+    update only if nobody changed it since it was read (412 otherwise).
+    """
     try:
-        # Check if item exists
-        response = table.get_item(Key={"id": item_id})
-        if 'Item' not in response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Item with id {item_id} not found"
-            )
+        versions = parse_if_match(if_match)
 
         # Build update expression
         update_data = {k: v for k, v in item_update.model_dump().items() if v is not None}
         if not update_data:
-            item = response['Item']
-            if 'price' in item and isinstance(item['price'], Decimal):
-                item['price'] = float(item['price'])
-            return Item(**item)
-
-        # Convert price to Decimal if present
-        if 'price' in update_data:
-            update_data['price'] = Decimal(str(update_data['price']))
-
-        update_data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+            result = await db.get_item(Key={"id": item_id})
+            if 'Item' not in result:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Item with id {item_id} not found"
+                )
+            if versions is not None and result['Item'].get('version') not in versions:
+                raise precondition_failed(item_id)
+            return item_json(item_response(result['Item']))
+
+        if 'name' in update_data:
+            update_data["name_lower"] = update_data["name"].lower()
+        update_data["updated_at"] = utc_timestamp()
 
         update_expression = "SET " + ", ".join([f"#{k} = :{k}" for k in update_data.keys()])
-        expression_attribute_names = {f"#{k}": k for k in update_data.keys()}
-        expression_attribute_values = {f":{k}": v for k, v in update_data.items()}
+        update_expression += ", #version = if_not_exists(#version, :zero) + :one"
+        condition_expression, condition_names, condition_values = write_condition(versions)
 
-        response = table.update_item(
+        result = await db.update_item(
             Key={"id": item_id},
             UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_attribute_names,
-            ExpressionAttributeValues=expression_attribute_values,
-            ReturnValues="ALL_NEW"
+            ConditionExpression=condition_expression,
+            ExpressionAttributeNames={
+                **{f"#{k}": k for k in update_data.keys()},
+                "#version": "version",
+                **condition_names
+            },
+            ExpressionAttributeValues={
+                **{f":{k}": v for k, v in update_data.items()},
+                ":zero": 0,
+                ":one": 1,
+                **condition_values
+            },
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
         )
+        item_cache.invalidate(item_id)
 
-        item = response['Attributes']
-        if 'price' in item and isinstance(item['price'], Decimal):
-            item['price'] = float(item['price'])
-
-        return Item(**item)
+        return item_json(item_response(result['Attributes']))
     except HTTPException:
         raise
+    except ClientError as e:
+        raise condition_failure(e, item_id) from e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update item: {str(e)}"
         )
 
+# Adjust item quantity
+@app.post("/items/{item_id}/quantity/adjust", response_model=Item, tags=["Items"], responses={
+    404: {"description": "Item not found"},
+    409: {"description": "Quantity would become negative"}
+})
+async def adjust_quantity(item_id: str, adjustment: QuantityAdjust):
+    """Add `delta` to the item's quantity atomically.
+
+    One `UpdateItem` with `ADD`, so concurrent adjustments to the same item
+    are applied server-side without reading first and without lost updates
+    or client retries. A decrement that would take the quantity below zero
+    is rejected with 409 and changes nothing.
+    """
+    condition_expression = "attribute_exists(#id)"
+    values = {
+        ":delta": adjustment.delta,
+        ":one": 1,
+        ":updated_at": utc_timestamp()
+    }
+    if adjustment.delta < 0:
+        condition_expression += " AND #quantity >= :required"
+        values[":required"] = -adjustment.delta
+
+    try:
+        result = await db.update_item(
+            Key={"id": item_id},
+            UpdateExpression="ADD #quantity :delta, #version :one SET #updated_at = :updated_at",
+            ConditionExpression=condition_expression,
+            ExpressionAttributeNames={
+                "#id": "id",
+                "#quantity": "quantity",
+                "#version": "version",
+                "#updated_at": "updated_at"
+            },
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD"
+        )
+        item_cache.invalidate(item_id)
+
+        return item_json(item_response(result['Attributes']))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException' and 'Item' in e.response:
+            current = e.response['Item'].get('quantity', {}).get('N', '0')
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Insufficient quantity for item {item_id}: have {current}, "
+                       f"cannot remove {-adjustment.delta}"
+            ) from e
+        raise condition_failure(e, item_id) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to adjust quantity: {str(e)}"
+        )
+
 # Delete item
 @app.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Items"])
-async def delete_item(item_id: str):
-    """Delete an item"""
+async def delete_item(item_id: str, if_match: Optional[str] = Header(None)):
+    """Delete an item with a single conditional write, honouring `If-Match`"""
     try:
-        # Check if item exists
-        response = table.get_item(Key={"id": item_id})
-        if 'Item' not in response:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Item with id {item_id} not found"
-            )
+        condition_expression, condition_names, condition_values = write_condition(parse_if_match(if_match))
 
-        table.delete_item(Key={"id": item_id})
+        kwargs = {}
+        if condition_values:
+            kwargs["ExpressionAttributeValues"] = condition_values
+
+        await db.delete_item(
+            Key={"id": item_id},
+            ConditionExpression=condition_expression,
+            ExpressionAttributeNames=condition_names,
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            **kwargs
+        )
+        item_cache.invalidate(item_id)
         return None
     except HTTPException:
         raise
+    except ClientError as e:
+        raise condition_failure(e, item_id) from e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete item: {str(e)}"
         )
 
+# Metrics
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """In-process counters for this worker.
+
+    `routes` holds request counts, DynamoDB calls, time and consumed
+    capacity per route, most expensive first.
+    """
+    return {
+        "item_cache": item_cache.stats(),
+        "idempotency_cache": idempotency_cache.stats(),
+        "routes": route_metrics.stats(),
+        "health": health.stats()
+    }
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -0,0 +1,156 @@
+"""Per-request DynamoDB usage accounting.
+
+``ItemsTable`` reports every DynamoDB call (duration and consumed capacity)
+to ``record_dynamodb_call``. ``DynamoDBUsageMiddleware`` gives each request
+its own ``DynamoDBUsage`` through a context variable, so calls made from
+tasks spawned by the request (batch chunks, scan segments) are counted too.
+When the response starts it adds the totals as headers, and once the request
+finishes it folds them into ``RouteMetrics`` for ``GET /metrics``.
+"""
+import time
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+
+WRITE_OPERATIONS = frozenset({
+    'put_item', 'update_item', 'delete_item', 'batch_write_item', 'transact_write_items'
+})
+
+_current_usage = ContextVar('dynamodb_usage', default=None)
+
+
+class DynamoDBUsage:
+    """DynamoDB calls made while handling one request"""
+
+    __slots__ = ('calls', 'seconds', 'read_units', 'write_units')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.read_units = 0.0
+        self.write_units = 0.0
+
+    def capacity_header(self) -> str:
+        return f"read={self.read_units:g}, write={self.write_units:g}"
+
+
+def record_dynamodb_call(operation: str, seconds: float, consumed=None):
+    """Add one DynamoDB call to the current request's usage, if any.
+
+    ``consumed`` is the ``ConsumedCapacity`` of the response: a dict for
+    single-item operations, a list for batch operations.
+    """
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage.calls += 1
+    usage.seconds += seconds
+    if not consumed:
+        return
+    units = sum(entry.get('CapacityUnits', 0) for entry in (
+        consumed if isinstance(consumed, list) else [consumed]
+    ))
+    if operation in WRITE_OPERATIONS:
+        usage.write_units += units
+    else:
+        usage.read_units += units
+
+
+class RouteMetrics:
+    """Cumulative request and DynamoDB usage per route, for this worker"""
+
+    def __init__(self):
+        self._routes = {}
+
+    def record(self, route: str, status_code: int, seconds: float, usage: DynamoDBUsage):
+        totals = self._routes.get(route)
+        if totals is None:
+            totals = self._routes[route] = {
+                'requests': 0, 'errors': 0, 'seconds': 0.0,
+                'dynamodb_calls': 0, 'dynamodb_seconds': 0.0,
+                'read_units': 0.0, 'write_units': 0.0,
+            }
+        totals['requests'] += 1
+        totals['errors'] += status_code >= 500
+        totals['seconds'] += seconds
+        totals['dynamodb_calls'] += usage.calls
+        totals['dynamodb_seconds'] += usage.seconds
+        totals['read_units'] += usage.read_units
+        totals['write_units'] += usage.write_units
+
+    def stats(self) -> dict:
+        """Totals and per-request averages, most expensive routes first"""
+        routes = sorted(
+            self._routes.items(),
+            key=lambda entry: entry[1]['read_units'] + entry[1]['write_units'],
+            reverse=True,
+        )
+        return {
+            route: {
+                'requests': t['requests'],
+                'errors': t['errors'],
+                'dynamodb_calls': t['dynamodb_calls'],
+                'read_units': round(t['read_units'], 3),
+                'write_units': round(t['write_units'], 3),
+                'avg_ms': round(t['seconds'] * 1000 / t['requests'], 3),
+                'avg_dynamodb_ms': round(t['dynamodb_seconds'] * 1000 / t['requests'], 3),
+                'avg_read_units': round(t['read_units'] / t['requests'], 3),
+                'avg_write_units': round(t['write_units'] / t['requests'], 3),
+            }
+            for route, t in routes
+        }
+
+
+class DynamoDBUsageMiddleware:
+    """ASGI middleware adding `X-DynamoDB-Consumed-Capacity` and
+    `Server-Timing` headers and recording per-route usage.
+
+    Headers reflect the calls made before the response started, so for
+    streaming responses (`/items/export`) they only cover the first page;
+    the route metrics include the whole stream.
+    """
+
+    def __init__(self, app, route_metrics: RouteMetrics):
+        self.app = app
+        self.route_metrics = route_metrics
+        self._paths = None
+
+    def route_key(self, scope) -> str:
+        if self._paths is None and 'app' in scope:
+            self._paths = {
+                route.endpoint: route.path
+                for route in scope['app'].routes if hasattr(route, 'endpoint')
+            }
+        path = (self._paths or {}).get(scope.get('endpoint'))
+        return f"{scope['method']} {path}" if path else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        usage = DynamoDBUsage()
+        token = _current_usage.set(usage)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_usage(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers = MutableHeaders(scope=message)
+                headers.append('X-DynamoDB-Consumed-Capacity', usage.capacity_header())
+                headers.append('Server-Timing', (
+                    f'dynamodb;dur={usage.seconds * 1000:.1f};desc="{usage.calls} call{"" if usage.calls == 1 else "s"}", '
+                    f'app;dur={(time.perf_counter() - started) * 1000:.1f}'
+                ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_usage)
+        finally:
+            _current_usage.reset(token)
+            self.route_metrics.record(
+                self.route_key(scope), status_code, time.perf_counter() - started, usage
+            )
@@ -0,0 +1,131 @@
+"""Load test for the Items CRUD API.
+
+Drives a mixed read/write workload against a running deployment and reports
+throughput (total and per ECS task) and latency percentiles per operation.
+Run it once against the previous image and once against the new one to
+compare:
+
+    pip install aiohttp
+    python benchmarks/loadtest.py --url $API_URL --concurrency 64 --duration 60 --tasks 2
+
+``--tasks`` should match the ECS service's running task count so the
+requests/sec per task figure is meaningful.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import aiohttp
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def seed_items(session, url, count):
+    """Create the items the read workload will fetch"""
+    ids = []
+    for i in range(count):
+        payload = {"name": f"loadtest-{i}", "description": "load test item", "price": 9.99, "quantity": 100}
+        async with session.post(f"{url}/items", json=payload) as response:
+            response.raise_for_status()
+            ids.append((await response.json())["id"])
+    return ids
+
+
+async def worker(session, url, ids, deadline, mix, latencies, errors):
+    operations = list(mix.keys())
+    weights = list(mix.values())
+    while time.perf_counter() < deadline:
+        operation = random.choices(operations, weights)[0]
+        if operation == "get":
+            request = session.get(f"{url}/items/{random.choice(ids)}")
+        elif operation == "list":
+            request = session.get(f"{url}/items", params={"limit": 20})
+        elif operation == "adjust":
+            # Concentrate adjustments on the first few items to exercise hot keys
+            payload = {"delta": random.choice((1, -1))}
+            request = session.post(f"{url}/items/{random.choice(ids[:5])}/quantity/adjust", json=payload)
+        else:
+            payload = {"name": "loadtest", "price": 1.0, "quantity": 1}
+            request = session.post(f"{url}/items", json=payload)
+
+        start = time.perf_counter()
+        try:
+            async with request as response:
+                await response.read()
+                if response.status >= 400:
+                    errors[operation] += 1
+                    continue
+        except aiohttp.ClientError:
+            errors[operation] += 1
+            continue
+        latencies[operation].append(time.perf_counter() - start)
+
+
+async def run(args):
+    """Run the workload, print the report and return the throughput in req/s"""
+    mix = {
+        "get": args.get_weight,
+        "list": args.list_weight,
+        "create": args.create_weight,
+        "adjust": args.adjust_weight
+    }
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        ids = await seed_items(session, args.url, args.seed)
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(session, args.url, ids, deadline, mix, latencies, errors)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"Duration: {elapsed:.1f}s  Concurrency: {args.concurrency}  Tasks: {args.tasks}")
+    print(f"Requests: {total}  Errors: {sum(errors.values())}")
+    print(f"Throughput: {total / elapsed:.1f} req/s  ({total / elapsed / args.tasks:.1f} req/s per task)")
+    print("")
+    print(f"{'operation':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for operation in mix:
+        values = latencies[operation]
+        mean = statistics.fmean(values) if values else 0.0
+        print(
+            f"{operation:<10}{len(values):>8}{errors[operation]:>8}"
+            f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+            f"{percentile(values, 99) * 1000:>10.1f}{mean * 1000:>10.1f}"
+        )
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Items CRUD API")
+    parser.add_argument("--url", required=True, help="API base URL (API Gateway endpoint or ALB)")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=60, help="Test duration in seconds")
+    parser.add_argument("--tasks", type=int, default=1, help="Running ECS task count")
+    parser.add_argument("--seed", type=int, default=50, help="Items to create before the test")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--get-weight", type=int, default=80)
+    parser.add_argument("--list-weight", type=int, default=10)
+    parser.add_argument("--create-weight", type=int, default=10)
+    parser.add_argument("--adjust-weight", type=int, default=0)
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Micro-benchmark for the list_items serialization path.
+
+Compares the per-item CPU cost of turning a page of raw DynamoDB items
+(attribute-value format, as returned by Scan) into a JSON response body:
+
+- baseline: boto3 TypeDeserializer (Decimal) -> float conversion ->
+  Item(**item) -> response_model validation -> json.dumps, which is what
+  list_items did before
+- fast: app.db.deserialize_item -> app.main.item_response -> orjson
+
+Run from the fastapi-app directory with the app requirements installed:
+
+    python -m benchmarks.serialization --items 100 --repeat 200
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+from typing import List
+
+import orjson
+from boto3.dynamodb.types import TypeDeserializer
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.db import deserialize_item
+from app.main import Item, item_response
+
+
+def raw_page(count):
+    return [
+        {
+            'id': {'S': f'01HZX{i:021d}'},
+            'name': {'S': f'Item {i}'},
+            'description': {'S': 'x' * 200},
+            'price': {'N': f'{i % 500 + 0.99}'},
+            'quantity': {'N': str(i % 1000)},
+            'created_at': {'S': '2024-01-01T00:00:00Z'},
+            'updated_at': {'S': '2024-01-01T00:00:00Z'},
+            'version': {'N': '1'},
+        }
+        for i in range(count)
+    ]
+
+
+def baseline(page, deserializer=TypeDeserializer(), adapter=TypeAdapter(List[Item])):
+    items = []
+    for raw in page:
+        item = {k: deserializer.deserialize(v) for k, v in raw.items()}
+        if 'price' in item and isinstance(item['price'], Decimal):
+            item['price'] = float(item['price'])
+        items.append(Item(**item))
+    # FastAPI's response_model handling: validate, dump, encode, then JSONResponse
+    validated = adapter.validate_python(items)
+    content = jsonable_encoder(adapter.dump_python(validated, mode='json'))
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def fast(page):
+    return orjson.dumps([item_response(deserialize_item(raw)) for raw in page])
+
+
+def measure(fn, page, repeat):
+    fn(page)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(page)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list_items serialization")
+    parser.add_argument("--items", type=int, default=100, help="Items per page")
+    parser.add_argument("--repeat", type=int, default=200, help="Pages per measurement")
+    args = parser.parse_args()
+
+    page = raw_page(args.items)
+    assert json.loads(baseline(page)) == json.loads(fast(page))
+
+    slow_time = measure(baseline, page, args.repeat)
+    fast_time = measure(fast, page, args.repeat)
+    per_item = 1e6 / args.items
+
+    print(f"{'path':<10}{'per page ms':>14}{'per item us':>14}")
+    print(f"{'baseline':<10}{slow_time * 1000:>14.3f}{slow_time * per_item:>14.2f}")
+    print(f"{'fast':<10}{fast_time * 1000:>14.3f}{fast_time * per_item:>14.2f}")
+    print(f"Saved {(slow_time - fast_time) * per_item:.2f} us per item ({slow_time / fast_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Backfill the query index keys on items written before the GSIs existed.
+
+Items created by older versions of the API have no ``entity_type`` or
+``name_lower`` attribute, so they are missing from the query indexes, and
+their ``created_at`` is not in the fixed-width format that created-index
+range queries compare as strings. This script scans the table in parallel,
+sets both attributes and rewrites ``created_at`` (same instant, normalized
+format) with conditional updates: an item deleted or renamed while the
+backfill runs is skipped rather than overwritten.
+
+Existing IDs are kept as they are (clients may hold them); only new items
+get time-sortable ULIDs, and created-index orders by ``created_at`` for all.
+
+Run from the fastapi-app directory with the app requirements installed and
+the same environment the service uses (DYNAMODB_TABLE_NAME, AWS_REGION):
+
+    python -m migrations.backfill_index_keys --segments 8
+
+The script is idempotent; re-running it only touches items that still lack
+the attributes.
+"""
+import argparse
+import asyncio
+
+from botocore.exceptions import ClientError
+
+from app.db import ITEM_ENTITY_TYPE, ItemsTable
+from app.ids import normalize_timestamp
+
+
+def normalized_created_at(item):
+    try:
+        return normalize_timestamp(item['created_at'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def backfill_item(table, item, semaphore, counts):
+    created_at = normalized_created_at(item)
+    if (
+        item.get('entity_type') == ITEM_ENTITY_TYPE
+        and 'name_lower' in item
+        and created_at in (None, item.get('created_at'))
+    ):
+        counts['current'] += 1
+        return
+
+    update_expression = "SET #entity_type = :entity_type, #name_lower = :name_lower"
+    names = {
+        '#id': 'id',
+        '#name': 'name',
+        '#entity_type': 'entity_type',
+        '#name_lower': 'name_lower',
+    }
+    values = {
+        ':entity_type': ITEM_ENTITY_TYPE,
+        ':name_lower': item['name'].lower(),
+        ':name': item['name'],
+    }
+    if created_at is not None:
+        update_expression += ", #created_at = :created_at"
+        names['#created_at'] = 'created_at'
+        values[':created_at'] = created_at
+    async with semaphore:
+        try:
+            await table.update_item(
+                Key={'id': item['id']},
+                UpdateExpression=update_expression,
+                ConditionExpression="attribute_exists(#id) AND #name = :name",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+            counts['updated'] += 1
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            counts['skipped'] += 1
+
+
+async def run(args):
+    table = ItemsTable.from_env()
+    await table.connect()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    counts = {'current': 0, 'updated': 0, 'skipped': 0}
+    try:
+        async for page in table.parallel_scan(args.segments, page_size=args.page_size):
+            await asyncio.gather(*(
+                backfill_item(table, item, semaphore, counts)
+                for item in page if 'name' in item
+            ))
+            if not args.quiet:
+                print(f"updated={counts['updated']} current={counts['current']} skipped={counts['skipped']}")
+    finally:
+        await table.close()
+    print(f"Done: {counts['updated']} updated, {counts['current']} already current, "
+          f"{counts['skipped']} changed concurrently and skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill query index keys on existing items")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--page-size", type=int, default=500, help="Items per scan page")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent UpdateItem calls")
+    parser.add_argument("--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
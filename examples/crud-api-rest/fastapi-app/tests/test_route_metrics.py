@@ -0,0 +1,30 @@
+"""Per-route metrics with the full middleware stack of app.main.
+
+Requests go through CORS, EncodingETagMiddleware, compression and
+DynamoDBUsageMiddleware, so a middleware that hands the router a copy of
+the scope shows up here as routes recorded as "unmatched". The requests
+only hit routes that do not call DynamoDB, and the client is not entered
+as a context manager, so the lifespan (DynamoDB pool, health prober)
+never starts.
+
+From the fastapi-app directory, with the app requirements plus pytest and
+httpx installed:
+
+    python -m pytest tests
+"""
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def test_routes_are_recorded_by_path():
+    client = TestClient(main.app)
+    client.get("/")
+    client.get("/health/live", headers={"If-None-Match": '"1-br"', "Accept-Encoding": "br"})
+    client.get("/no-such-route")
+
+    routes = client.get("/metrics").json()["routes"]
+
+    assert routes["GET /"]["requests"] == 1
+    assert routes["GET /health/live"]["requests"] == 1
+    assert routes["unmatched"]["requests"] == 1
@@ -0,0 +1,102 @@
+"""One-off seeding of the item aggregates from the items already in the table.
+
+The stream processor only sees changes, so items written before the stream
+was enabled are missing from the summary until they next change. This
+script scans the items table (strongly consistent, in parallel segments)
+and counts every item that has no watermark yet: per group of up to 99
+items, one transaction adds their contributions to the summary and writes
+their watermarks, the same way the stream processor does.
+
+It is safe to run while the API takes writes. An item the stream processor
+has already counted has a watermark and is skipped, and a change the scan
+raced with is applied by the stream processor against the contribution
+seeded here. Re-running it only counts items that still have no watermark.
+
+Run from the stream-processor directory with credentials that may scan the
+items table and write the stats table:
+
+    STATS_TABLE_NAME=$(terraform -chdir=../terraform output -raw stats_table_name) \\
+      python seed.py --items-table $(terraform -chdir=../terraform output -raw dynamodb_table_name) --segments 8
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import (
+    ITEMS_PER_TRANSACTION,
+    NOTHING,
+    contribution,
+    dynamodb,
+    transact,
+    watermark_update,
+)
+
+# Below every stream sequence number, so all records not yet applied run
+# against the seeded contribution
+SEEDED_SEQUENCE = '0' * 40
+
+
+def seed_items(items):
+    """Count the items that have no watermark; returns how many were counted"""
+    images = {item['id']['S']: item for item in items}
+
+    def plan(watermarks):
+        actions = []
+        totals = NOTHING
+        for item_id, image in images.items():
+            if item_id in watermarks:
+                continue
+            counted = contribution(image)
+            totals = tuple(t + c for t, c in zip(totals, counted))
+            actions.append(watermark_update(item_id, SEEDED_SEQUENCE, None, counted))
+        return actions, totals
+
+    return transact(list(images), plan)
+
+
+def seed_segment(table_name, segment, total_segments, page_size, counts, lock):
+    kwargs = {
+        'TableName': table_name,
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'ConsistentRead': True,
+        'Limit': page_size,
+        'ProjectionExpression': 'id, price, quantity',
+    }
+    while True:
+        page = dynamodb.scan(**kwargs)
+        items = page.get('Items', [])
+        seeded = sum(
+            seed_items(items[start:start + ITEMS_PER_TRANSACTION])
+            for start in range(0, len(items), ITEMS_PER_TRANSACTION)
+        )
+        with lock:
+            counts['scanned'] += len(items)
+            counts['seeded'] += seeded
+        if 'LastEvaluatedKey' not in page:
+            return
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the item aggregates from the existing items")
+    parser.add_argument("--items-table", required=True, help="Items table to scan")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--page-size", type=int, default=990, help="Items per scan page")
+    args = parser.parse_args()
+
+    counts = {'scanned': 0, 'seeded': 0}
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=args.segments) as executor:
+        futures = [
+            executor.submit(seed_segment, args.items_table, segment, args.segments, args.page_size, counts, lock)
+            for segment in range(args.segments)
+        ]
+        for future in futures:
+            future.result()
+    print(f"Done: {counts['scanned']} items scanned, {counts['seeded']} counted, "
+          f"{counts['scanned'] - counts['seeded']} already counted")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,56 @@ module "dynamodb" {
   enable_point_in_time_recovery = true
   enable_encryption             = true
 
+  # Change stream for the item stats processor (stats.tf)
+  enable_streams   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
+  # Query indexes for GET /items filters. Every item carries
+  # entity_type = "ITEM" so one index partition holds all items in key order.
+  global_secondary_indexes = [
+    {
+      name            = "name-index"
+      hash_key        = "entity_type"
+      range_key       = "name_lower"
+      projection_type = "ALL"
+    },
+    {
+      name            = "price-index"
+      hash_key        = "entity_type"
+      range_key       = "price"
+      range_key_type  = "N"
+      projection_type = "ALL"
+    },
+    {
+      name            = "quantity-index"
+      hash_key        = "entity_type"
+      range_key       = "quantity"
+      range_key_type  = "N"
+      projection_type = "ALL"
+    },
+    {
+      name            = "created-index"
+      hash_key        = "entity_type"
+      range_key       = "created_at"
+      projection_type = "ALL"
+    }
+  ]
+
+  tags = var.tags
+}
+
+# Stored first responses for Idempotency-Key retries of POST /items
+module "idempotency_table" {
+  source = "../../../modules/dynamodb"
+
+  table_name        = "${var.project_name}-idempotency"
+  hash_key          = "pk"
+  billing_mode      = "PAY_PER_REQUEST"
+  enable_encryption = true
+
+  ttl_enabled        = true
+  ttl_attribute_name = "expires_at"
+
   tags = var.tags
 }
 
@@ -61,7 +111,8 @@ module "alb" {
   vpc_id            = module.vpc.vpc_id
   subnet_ids        = module.vpc.private_subnet_ids
   target_port       = 8000
-  health_check_path = "/health"
+  health_check_path = "/health/live"
+  idle_timeout      = var.alb_idle_timeout
 
   tags = var.tags
 }
@@ -76,6 +127,8 @@ module "ecs" {
   container_name     = "api"
   container_image    = "${module.ecr.repository_url}:latest"
   container_port     = 8000
+  cpu                = var.task_cpu
+  memory             = var.task_memory
   execution_role_arn = aws_iam_role.ecs_execution.arn
   task_role_arn      = aws_iam_role.ecs_task.arn
   subnet_ids         = module.vpc.private_subnet_ids
@@ -93,6 +146,30 @@ module "ecs" {
     {
       name  = "AWS_REGION"
       value = var.aws_region
+    },
+    {
+      name  = "ITEM_CACHE_MAX_SIZE"
+      value = tostring(var.item_cache_max_size)
+    },
+    {
+      name  = "ITEM_CACHE_TTL_SECONDS"
+      value = tostring(var.item_cache_ttl_seconds)
+    },
+    {
+      name  = "STATS_TABLE_NAME"
+      value = module.stats_table.table_name
+    },
+    {
+      name  = "IDEMPOTENCY_TABLE_NAME"
+      value = module.idempotency_table.table_name
+    },
+    {
+      name  = "IDEMPOTENCY_TTL_SECONDS"
+      value = tostring(var.idempotency_ttl_seconds)
+    },
+    {
+      name  = "KEEP_ALIVE_TIMEOUT"
+      value = tostring(var.alb_idle_timeout + 5)
     }
   ]
 
@@ -107,7 +184,7 @@ module "api_gateway_rest" {
   vpc_link_subnet_ids = module.vpc.private_subnet_ids
   alb_arn             = module.alb.alb_arn
   vpc_id              = module.vpc.vpc_id
-  health_check_path   = "/health"
+  health_check_path   = "/health/live"
 
   # OpenAPI/Swagger specification
   openapi_spec = templatefile("${path.module}/../swagger.json", {
@@ -248,6 +325,8 @@ resource "aws_iam_role_policy" "ecs_task_dynamodb" {
           "dynamodb:PutItem",
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem",
           "dynamodb:Query",
           "dynamodb:Scan"
         ]
@@ -255,6 +334,20 @@ resource "aws_iam_role_policy" "ecs_task_dynamodb" {
           module.dynamodb.table_arn,
           "${module.dynamodb.table_arn}/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem"
+        ]
+        Resource = module.stats_table.table_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem"
+        ]
+        Resource = module.idempotency_table.table_arn
       }
     ]
   })
@@ -28,6 +28,21 @@ output "ecr_repository_url" {
   value       = module.ecr.repository_url
 }
 
+output "stats_table_name" {
+  description = "DynamoDB table holding the item aggregates"
+  value       = module.stats_table.table_name
+}
+
+output "stream_processor_ecr_repository_url" {
+  description = "ECR repository URL for the stream processor image"
+  value       = module.stream_processor_ecr.repository_url
+}
+
+output "stream_processor_function_name" {
+  description = "Stream processor Lambda function name"
+  value       = module.stream_processor.function_name
+}
+
 output "cluster_name" {
   description = "ECS cluster name"
   value       = module.ecs.cluster_id
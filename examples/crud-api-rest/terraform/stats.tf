@@ -0,0 +1,130 @@
+# Item aggregates maintained from the items table's DynamoDB stream.
+# The stream processor Lambda keeps a summary item (plus per-item stream
+# watermarks) in the stats table; GET /items/stats reads the summary.
+
+module "stats_table" {
+  source = "../../../modules/dynamodb"
+
+  table_name                    = "${var.project_name}-item-stats"
+  hash_key                      = "pk"
+  billing_mode                  = "PAY_PER_REQUEST"
+  enable_point_in_time_recovery = true
+  enable_encryption             = true
+
+  # Watermarks of deleted items expire once the stream can no longer replay them
+  ttl_enabled        = true
+  ttl_attribute_name = "expires_at"
+
+  tags = var.tags
+}
+
+module "stream_processor_ecr" {
+  source = "../../../modules/ecr"
+
+  repository_name = "${var.project_name}-stream-processor"
+  tags            = var.tags
+}
+
+# Records that still fail after all retries
+module "stream_processor_failures" {
+  source = "../../../modules/sqs"
+
+  queue_name = "${var.project_name}-stream-processor-failures"
+  create_dlq = false
+
+  tags = var.tags
+}
+
+resource "aws_iam_role" "stream_processor" {
+  name = "${var.project_name}-stream-processor"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Action = "sts:AssumeRole"
+      Effect = "Allow"
+      Principal = {
+        Service = "lambda.amazonaws.com"
+      }
+    }]
+  })
+
+  tags = var.tags
+}
+
+resource "aws_iam_role_policy_attachment" "stream_processor_basic" {
+  role       = aws_iam_role.stream_processor.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy" "stream_processor" {
+  name = "${var.project_name}-stream-processor"
+  role = aws_iam_role.stream_processor.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = module.dynamodb.stream_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:BatchGetItem",
+          "dynamodb:UpdateItem"
+        ]
+        Resource = module.stats_table.table_arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = "sqs:SendMessage"
+        Resource = module.stream_processor_failures.queue_arn
+      }
+    ]
+  })
+}
+
+module "stream_processor" {
+  source = "../../../modules/lambda"
+
+  function_name      = "${var.project_name}-stream-processor"
+  execution_role_arn = aws_iam_role.stream_processor.arn
+  image_uri          = "${module.stream_processor_ecr.repository_url}:latest"
+  timeout            = 60
+  memory_size        = 256
+
+  environment_variables = {
+    STATS_TABLE_NAME    = module.stats_table.table_name
+    LOW_STOCK_THRESHOLD = tostring(var.low_stock_threshold)
+  }
+
+  tags = var.tags
+}
+
+resource "aws_lambda_event_source_mapping" "item_stream" {
+  event_source_arn  = module.dynamodb.stream_arn
+  function_name     = module.stream_processor.function_name
+  starting_position = "TRIM_HORIZON"
+
+  # Larger batches mean fewer summary updates; the processor folds every
+  # batch into one transaction per 99 items
+  batch_size                         = 500
+  maximum_batching_window_in_seconds = 1
+
+  # Replays are safe: the processor skips records at or below each item's watermark
+  bisect_batch_on_function_error = true
+  maximum_retry_attempts         = 10
+
+  destination_config {
+    on_failure {
+      destination_arn = module.stream_processor_failures.queue_arn
+    }
+  }
+}
@@ -0,0 +1,97 @@
+"""Throughput benchmark: one Publish per event against the batching
+Publisher.
+
+Publishes --events events from --producers threads, first with one
+Publish call per event (what the services do today), then through a
+shared Publisher. Reports events per second and SNS API calls.
+
+Runs against a real topic (--topic-arn) or a topic it creates on a local
+stand-in such as moto's server:
+
+    moto_server -p 9911
+    export SNS_ENDPOINT_URL=http://localhost:9911 AWS_DEFAULT_REGION=us-east-1 \\
+      AWS_ACCESS_KEY_ID=local AWS_SECRET_ACCESS_KEY=local
+
+Then, from the publisher directory:
+
+    python -m benchmarks.throughput --events 2000 --producers 8
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+from publisher import Publisher, message_attributes
+
+
+def count_calls(client):
+    """A Counter of the API calls `client` makes from now on, by operation"""
+    calls = Counter()
+    client.meta.events.register('before-call', lambda model, **kwargs: calls.update([model.name]))
+    return calls
+
+
+def event(i):
+    return {
+        'event_type': 'order_created' if i % 2 else 'user_signup',
+        'priority': 'high' if i % 10 == 0 else 'low',
+        'order_id': str(i),
+    }
+
+
+def single(sns, topic_arn, args):
+    def send(i):
+        body = event(i)
+        sns.publish(TopicArn=topic_arn, Message=json.dumps(body), MessageAttributes=message_attributes(body))
+
+    with ThreadPoolExecutor(max_workers=args.producers) as executor:
+        list(executor.map(send, range(args.events)))
+
+
+def batched(sns, topic_arn, args):
+    with Publisher(
+        topic_arn, sns=sns, linger_ms=args.linger_ms, max_in_flight=args.in_flight,
+        metrics_stream=open(os.devnull, 'w'),  # keep EMF output out of the timing
+    ) as shared:
+        with ThreadPoolExecutor(max_workers=args.producers) as executor:
+            futures = list(executor.map(lambda i: shared.publish(event(i)), range(args.events)))
+    for future in futures:
+        future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SNS Publish against PublishBatch")
+    parser.add_argument("--events", type=int, default=2000, help="Events per run")
+    parser.add_argument("--producers", type=int, default=8, help="Threads calling publish")
+    parser.add_argument("--linger-ms", type=float, default=20, help="Publisher linger time")
+    parser.add_argument("--in-flight", type=int, default=4, help="Concurrent PublishBatch calls")
+    parser.add_argument("--topic-arn", help="Existing topic (default: create one on SNS_ENDPOINT_URL)")
+    args = parser.parse_args()
+
+    sns = boto3.client(
+        'sns',
+        endpoint_url=os.environ.get('SNS_ENDPOINT_URL'),
+        config=Config(max_pool_connections=max(args.producers, args.in_flight)),
+    )
+    topic_arn = args.topic_arn or sns.create_topic(Name=f'publisher-benchmark-{uuid.uuid4().hex[:8]}')['TopicArn']
+
+    print(f"{'mode':<10}{'events/s':>10}{'seconds':>10}{'api calls':>11}")
+    for name, run in (('publish', single), ('batch', batched)):
+        calls = count_calls(sns)
+        started = time.perf_counter()
+        run(sns, topic_arn, args)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<10}{args.events / elapsed:>10.0f}{elapsed:>10.2f}{sum(calls.values()):>11}")
+
+    if not args.topic_arn:
+        sns.delete_topic(TopicArn=topic_arn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Batching SNS publisher for the fan-out topic.
+
+publish() buffers an event and returns a Future for its MessageId. A
+background thread sends buffered events with PublishBatch: up to 10
+entries per call, as soon as 10 are waiting or the oldest one has waited
+linger_ms. Up to max_in_flight calls run at once.
+
+Entries that fail on the SNS side (throttling, internal errors) are sent
+again with exponential backoff, up to max_attempts. Entries SNS rejects as
+invalid (SenderFault) fail right away. Either way the event's Future
+raises PublishError.
+
+The routing fields of an event (event_type, priority) are copied into
+message attributes when it is published. The subscription filter policies
+of the topic match on attributes, so SNS routes the event without parsing
+its body, and producers do not have to set the attributes themselves.
+
+Per PublishBatch call, the publisher records latency and batch fill. It
+writes them every metrics_interval seconds as CloudWatch Embedded Metric
+Format lines on stdout (or metrics_stream), as the sqs-queue processor does.
+
+    with Publisher(topic_arn) as publisher:
+        publisher.publish({'event_type': 'order_created', 'order_id': '12345'})
+
+Events still buffered when the process exits are lost, so call close() (or
+leave the with block) on shutdown.
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 262144
+
+# Event fields copied into message attributes for the filter policies
+ROUTING_FIELDS = ('event_type', 'priority')
+
+# Error codes of a failed PublishBatch call worth retrying
+RETRYABLE_CODES = frozenset({
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestLimitExceeded',
+    'InternalError', 'InternalFailure', 'ServiceUnavailable', 'KMSThrottling',
+})
+
+class PublishError(Exception):
+    """An event SNS rejected, or that still failed after max_attempts"""
+
+    def __init__(self, code, message, sender_fault=False):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.sender_fault = sender_fault
+
+def message_attributes(event, fields=ROUTING_FIELDS):
+    """SNS message attributes for the routing fields present in `event`"""
+    attributes = {}
+    for name in fields:
+        value = event.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            attributes[name] = {'DataType': 'String', 'StringValue': 'true' if value else 'false'}
+        elif isinstance(value, (int, float)):
+            attributes[name] = {'DataType': 'Number', 'StringValue': str(value)}
+        elif isinstance(value, str):
+            attributes[name] = {'DataType': 'String', 'StringValue': value}
+        elif isinstance(value, (list, tuple)):
+            attributes[name] = {'DataType': 'String.Array', 'StringValue': json.dumps(list(value))}
+        else:
+            raise TypeError(f"Routing field '{name}' has type {type(value).__name__}")
+    return attributes
+
+def message_size(message, attributes):
+    """Bytes SNS counts against the message and batch size limits"""
+    size = len(message.encode('utf-8'))
+    for name, attribute in attributes.items():
+        size += len(name.encode('utf-8')) + len(attribute['DataType'].encode('utf-8'))
+        size += len(attribute['StringValue'].encode('utf-8'))
+    return size
+
+class _Entry:
+    """A buffered event and the Future its caller holds"""
+
+    def __init__(self, request, size):
+        self.request = request
+        self.size = size
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+class Metrics:
+    """PublishBatch calls of one interval, written as EMF.
+
+    Latency and fill are sampled (reservoir of 100 values, the most EMF
+    takes per metric), counts are exact.
+    """
+
+    SAMPLES = 100
+
+    def __init__(self, namespace, topic, stream=None):
+        self.namespace = namespace
+        self.topic = topic
+        self.stream = stream  # file the lines go to; None is sys.stdout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._counts = {'PublishCalls': 0, 'Published': 0, 'Failed': 0, 'Retried': 0}
+        self._latency = []
+        self._fill = []
+
+    def _sample(self, values, value):
+        if len(values) < self.SAMPLES:
+            values.append(value)
+        else:
+            index = random.randrange(self._counts['PublishCalls'])
+            if index < self.SAMPLES:
+                values[index] = value
+
+    def call(self, entries, seconds):
+        """One PublishBatch call with `entries` entries"""
+        with self._lock:
+            self._counts['PublishCalls'] += 1
+            self._sample(self._latency, round(seconds * 1000, 3))
+            self._sample(self._fill, entries)
+
+    def published(self, count=1):
+        with self._lock:
+            self._counts['Published'] += count
+
+    def failed(self, count=1):
+        with self._lock:
+            self._counts['Failed'] += count
+
+    def retried(self, count):
+        with self._lock:
+            self._counts['Retried'] += count
+
+    def document(self):
+        """The EMF document of the interval so far (None if idle), and reset"""
+        with self._lock:
+            if not self._counts['PublishCalls']:
+                return None
+            values = {name: (count, 'Count') for name, count in self._counts.items()}
+            values['PublishLatency'] = (self._latency, 'Milliseconds')
+            values['BatchFill'] = (self._fill, 'Count')
+            self._reset()
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [['Topic']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in values.items()],
+                }],
+            },
+            'Topic': self.topic,
+            **{name: value for name, (value, _) in values.items()},
+        }
+
+    def flush(self):
+        document = self.document()
+        if document is not None:
+            print(json.dumps(document), file=self.stream)
+
+class Publisher:
+    """Buffers events and publishes them to one topic with PublishBatch"""
+
+    def __init__(self, topic_arn, sns=None, linger_ms=20, max_in_flight=4, max_attempts=5,
+                 max_buffered=10000, routing_fields=ROUTING_FIELDS,
+                 metrics_namespace='SnsPublisher', metrics_interval=60, metrics_stream=None):
+        if sns is None:
+            import boto3
+            from botocore.config import Config
+            sns = boto3.client('sns', config=Config(max_pool_connections=max_in_flight))
+        self.sns = sns
+        self.topic_arn = topic_arn
+        self.linger = linger_ms / 1000
+        self.max_attempts = max_attempts
+        self.max_buffered = max_buffered
+        self.routing_fields = routing_fields
+        self.metrics = Metrics(metrics_namespace, topic_arn.rsplit(':', 1)[-1], metrics_stream)
+        self.metrics_interval = metrics_interval
+
+        self._buffer = deque()
+        self._pending = 0  # buffered or being sent
+        self._flushing = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='sns-publish')
+        self._thread = threading.Thread(target=self._run, name='sns-batcher', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def publish(self, event, attributes=None, group_id=None, deduplication_id=None):
+        """Queue an event and return a Future resolving to its MessageId.
+
+        `event` is a dict (sent as JSON) or a string. `attributes` are added
+        to those computed from the routing fields. `group_id` and
+        `deduplication_id` are for FIFO topics. Blocks while max_buffered
+        events are waiting.
+        """
+        if isinstance(event, str):
+            message = event
+            computed = {}
+        else:
+            message = json.dumps(event)
+            computed = message_attributes(event, self.routing_fields)
+        attributes = {**computed, **(attributes or {})}
+        size = message_size(message, attributes)
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f"Message of {size} bytes exceeds the SNS limit of {MAX_BATCH_BYTES}")
+
+        request = {'Message': message}
+        if attributes:
+            request['MessageAttributes'] = attributes
+        if group_id is not None:
+            request['MessageGroupId'] = group_id
+        if deduplication_id is not None:
+            request['MessageDeduplicationId'] = deduplication_id
+        entry = _Entry(request, size)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Publisher is closed")
+            while len(self._buffer) >= self.max_buffered:
+                self._cond.wait()
+            self._buffer.append(entry)
+            self._pending += 1
+            if len(self._buffer) >= MAX_BATCH_ENTRIES or len(self._buffer) == 1:
+                self._cond.notify_all()
+        return entry.future
+
+    def flush(self, timeout=None):
+        """Send everything buffered now and wait until it is settled.
+        Returns False if `timeout` passed first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=None):
+        """Flush, stop the background thread and write the last metrics"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self.metrics.flush()
+
+    def _run(self):
+        next_metrics = time.monotonic() + self.metrics_interval
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if now >= next_metrics:
+                        break
+                    if self._buffer and (
+                        len(self._buffer) >= MAX_BATCH_ENTRIES
+                        or self._flushing
+                        or self._closed
+                        or now - self._buffer[0].enqueued >= self.linger
+                    ):
+                        break
+                    if self._closed:
+                        return
+                    wait = next_metrics - now
+                    if self._buffer:
+                        wait = min(wait, self._buffer[0].enqueued + self.linger - now)
+                    self._cond.wait(wait)
+                batch = self._take() if self._buffer else []
+                if batch:
+                    self._cond.notify_all()  # room in the buffer
+
+            if time.monotonic() >= next_metrics:
+                self.metrics.flush()
+                next_metrics = time.monotonic() + self.metrics_interval
+            if batch:
+                self._slots.acquire()
+                self._executor.submit(self._send, batch)
+
+    def _take(self):
+        """Up to 10 buffered entries that fit in one PublishBatch request"""
+        batch = []
+        size = 0
+        while self._buffer and len(batch) < MAX_BATCH_ENTRIES:
+            entry = self._buffer[0]
+            if batch and size + entry.size > MAX_BATCH_BYTES:
+                break
+            batch.append(self._buffer.popleft())
+            size += entry.size
+        return batch
+
+    def _send(self, batch):
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                batch = self._publish_batch(batch, final=attempt == self.max_attempts)
+                if not batch:
+                    break
+                self.metrics.retried(len(batch))
+                time.sleep(min(0.05 * 2 ** attempt, 5) * random.uniform(0.5, 1))
+        finally:
+            self._slots.release()
+
+    def _publish_batch(self, batch, final):
+        """One PublishBatch call. Settles entries that succeeded or cannot
+        be retried, and returns those to retry."""
+        started = time.perf_counter()
+        try:
+            response = self.sns.publish_batch(
+                TopicArn=self.topic_arn,
+                PublishBatchRequestEntries=[
+                    {'Id': str(index), **entry.request} for index, entry in enumerate(batch)
+                ],
+            )
+        except Exception as e:
+            self.metrics.call(len(batch), time.perf_counter() - started)
+            code = e.response['Error'].get('Code') if isinstance(e, ClientError) else type(e).__name__
+            if final or not retryable(e):
+                for entry in batch:
+                    self._settle(entry, error=PublishError(code, str(e)))
+                return []
+            return batch
+
+        self.metrics.call(len(batch), time.perf_counter() - started)
+        for result in response.get('Successful', []):
+            self._settle(batch[int(result['Id'])], message_id=result['MessageId'])
+        retry = []
+        for result in response.get('Failed', []):
+            entry = batch[int(result['Id'])]
+            if final or result.get('SenderFault'):
+                self._settle(entry, error=PublishError(result['Code'], result.get('Message'), result.get('SenderFault', False)))
+            else:
+                retry.append(entry)
+        return retry
+
+    def _settle(self, entry, message_id=None, error=None):
+        if error is None:
+            self.metrics.published()
+            entry.future.set_result(message_id)
+        else:
+            self.metrics.failed()
+            entry.future.set_exception(error)
+        with self._cond:
+            self._pending -= 1
+            if not self._pending:
+                self._cond.notify_all()
+
+def retryable(error):
+    """Whether a failed PublishBatch call may succeed when repeated"""
+    if isinstance(error, ClientError):
+        code = error.response['Error'].get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in RETRYABLE_CODES or status >= 500
+    # Connection errors and timeouts
+    return isinstance(error, BotoCoreError)
@@ -44,6 +44,14 @@ docker buildx build \
   --output type=image,name=${ECR_REPO}:${IMAGE_TAG},push=true \
   "$PROCESSOR_DIR"
 
+# Same processor code, packaged for the ECS consumer (enable_ecs_consumer)
+docker buildx build \
+  --platform linux/amd64 \
+  --provenance=false \
+  --file "$PROCESSOR_DIR/Dockerfile.consumer" \
+  --output type=image,name=${ECR_REPO}:consumer-${IMAGE_TAG},push=true \
+  "$PROCESSOR_DIR"
+
 # Step 5: Deploy infrastructure
 echo ""
 echo "Step 5: Deploying infrastructure..."
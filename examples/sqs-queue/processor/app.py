@@ -1,41 +1,237 @@
 import json
 import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import claimcheck
+from dedup import BUSY, CLAIMED, DUPLICATE, DedupStore
+from handlers import registry
+from registry import Message, unknown_sink_from_env
+from telemetry import Metrics, log
+
+# Handler sub-batches processed in parallel within one batch
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', '10'))
+
+# Where messages of no registered type go (UNKNOWN_MESSAGE_SINK)
+unknown_sink = unknown_sink_from_env()
+
+# Skips messages already processed (DEDUP_TABLE_NAME); None if disabled
+dedup = DedupStore.from_env()
+
+# CloudWatch namespace of the EMF metrics
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'SqsProcessor')
 
 def handler(event, context):
-    """Process SQS messages"""
-    print(f"Processing {len(event['Records'])} messages")
-    
-    for record in event['Records']:
-        try:
-            # Parse message
-            body = json.loads(record['body'])
-            message_id = record['messageId']
-            
-            print(f"Processing message {message_id}: {body}")
-            
-            # Process based on queue type
-            if 'orderId' in body:
-                process_order(body)
-            elif 'transactionId' in body:
-                process_transaction(body)
+    """Process SQS messages by type, reporting failed ones individually.
+
+    The event source mappings use ReportBatchItemFailures: only the
+    messages listed in batchItemFailures return to the queue, and the rest
+    of the batch is deleted.
+    """
+    records = event['Records']
+    log.context = {'requestId': getattr(context, 'aws_request_id', None)}
+    metrics = Metrics(METRICS_NAMESPACE, queue_name(records))
+
+    try:
+        failed = process_batch(records, MAX_CONCURRENCY, metrics)
+        metrics.batch(len(records), len(failed))
+    finally:
+        metrics.flush()
+
+    log.info("Batch processed", queue=metrics.queue, messages=len(records), failed=len(failed))
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed]}
+
+def queue_name(records):
+    """Name of the queue a batch came from (the last part of its ARN)"""
+    arn = records[0].get('eventSourceARN', '') if records else ''
+    return arn.rsplit(':', 1)[-1] or 'unknown'
+
+def split_lanes(records):
+    """Split a batch into lanes that are independent of each other.
+
+    Messages of a FIFO queue share a lane per MessageGroupId, in batch
+    order. Each standard queue message is a lane of its own.
+    """
+    lanes = {}
+    for index, record in enumerate(records):
+        group_id = record.get('attributes', {}).get('MessageGroupId')
+        key = ('group', group_id) if group_id is not None else ('message', index)
+        lanes.setdefault(key, []).append(record)
+    return list(lanes.values())
+
+def process_batch(records, max_concurrency, metrics, claims=None):
+    """Process a batch in waves and return the IDs of failed messages in
+    batch order.
+
+    Wave n holds the n-th message of every lane, so a standard queue batch
+    is a single wave, and a FIFO batch runs its groups side by side in
+    order. A failed message blocks its lane: later messages of the lane
+    are reported as failed without being processed, so the group's order
+    holds when they are redelivered.
+
+    If `claims` is a set, it holds the dedup keys claimed and not yet
+    completed or released while the batch runs.
+    """
+    lanes = split_lanes(records)
+    blocked = set()
+    failed = set()
+
+    for depth in range(max((len(lane) for lane in lanes), default=0)):
+        wave = []
+        for index, lane in enumerate(lanes):
+            if depth >= len(lane):
+                continue
+            if index in blocked:
+                failed.add(lane[depth]['messageId'])
             else:
-                print(f"Unknown message type: {body}")
-            
+                wave.append((index, lane[depth]))
+
+        wave_failed = process_wave([record for _, record in wave], max_concurrency, metrics, claims)
+        for index, record in wave:
+            if record['messageId'] in wave_failed:
+                blocked.add(index)
+        failed |= wave_failed
+
+    return [record['messageId'] for record in records if record['messageId'] in failed]
+
+def process_wave(records, max_concurrency, metrics, claims=None):
+    """Group records by message type and run each type's handler on
+    sub-batches of up to its batch_size, up to max_concurrency at a time.
+
+    Records that are not JSON (or whose S3 payload cannot be loaded) or
+    that fail their type's schema are failed.
+    With deduplication on, messages already processed are dropped and
+    counted as successful. Messages another invocation is still processing
+    are failed, so they are retried later. Handlers run in worker threads,
+    so they must be thread-safe. boto3 clients are, but resources and
+    sessions are not.
+    """
+    failed = set()
+    accepted = []
+    unknown = []
+
+    for record, body, error in decode_bodies(records, max_concurrency, metrics):
+        message_id = record['messageId']
+        if error is not None:
+            log.error("Unparsable message", messageId=message_id, error=str(error), body=log.body(record['body']))
+            metrics.rejected('unparsable')
+            failed.add(message_id)
+            continue
+
+        message = Message(message_id, body, record)
+        message_type = registry.resolve(body)
+        if message_type is None:
+            unknown.append(message)
+            continue
+
+        error = message_type.validate(body)
+        if error:
+            log.error("Invalid message", messageId=message_id, messageType=message_type.name, error=error, body=log.body(body))
+            metrics.rejected(message_type.name)
+            failed.add(message_id)
+            continue
+        log.sampled("Processing message", messageId=message_id, messageType=message_type.name, body=log.body(body))
+        accepted.append((message_type, message))
+
+    if unknown:
+        metrics.rejected('unknown', len(unknown))
+        failed.update(unknown_sink(unknown))
+
+    keys = {}
+    if dedup is not None:
+        accepted, keys, busy = claim_messages(accepted, max_concurrency, metrics)
+        failed.update(busy)
+        if claims is not None:
+            claims.update(keys.values())
+
+    by_type = defaultdict(list)
+    for message_type, message in accepted:
+        by_type[message_type].append(message)
+    jobs = [
+        (message_type, messages[start:start + message_type.batch_size])
+        for message_type, messages in by_type.items()
+        for start in range(0, len(messages), message_type.batch_size)
+    ]
+    for result in run_parallel(lambda job: run_handler(*job, metrics), jobs, max_concurrency):
+        failed.update(result)
+
+    if keys:
+        dedup.complete([key for message_id, key in keys.items() if message_id not in failed])
+        dedup.release([key for message_id, key in keys.items() if message_id in failed])
+        if claims is not None:
+            claims.difference_update(keys.values())
+    return failed
+
+def decode_bodies(records, max_concurrency, metrics):
+    """Parse record bodies and return (record, body, error) tuples.
+
+    Claim-check pointers are replaced by their S3 payloads, which are
+    fetched and parsed concurrently.
+    """
+    def decode(record):
+        try:
+            location = claimcheck.pointer(record['body'])
+            if location is None:
+                return record, json.loads(record['body']), None
+            started = time.perf_counter()
+            body, size = claimcheck.load(*location)
+            metrics.large_payload(size, time.perf_counter() - started)
+            return record, body, None
         except Exception as e:
-            print(f"Error processing message: {e}")
-            raise  # Re-raise to send to DLQ
-    
-    return {
-        'statusCode': 200,
-        'body': json.dumps(f'Processed {len(event["Records"])} messages')
-    }
-
-def process_order(order):
-    """Process order message"""
-    print(f"Processing order: {order['orderId']}, amount: ${order['amount']}")
-    # Add your order processing logic here
-
-def process_transaction(transaction):
-    """Process transaction message"""
-    print(f"Processing transaction: {transaction['transactionId']}, amount: ${transaction['amount']}")
-    # Add your transaction processing logic here
+            return record, None, e
+
+    has_pointers = any(claimcheck.POINTER_CLASS in record['body'][:80] for record in records)
+    return run_parallel(decode, records, max_concurrency if has_pointers else 1)
+
+def claim_messages(accepted, max_concurrency, metrics):
+    """Claim the dedup key of each accepted message.
+
+    Returns the messages to process, their keys by message ID, and the IDs
+    of messages that must be retried later.
+    """
+    def claim(entry):
+        message_type, message = entry
+        key = None
+        try:
+            key = dedup.key(message_type, message)
+            if dedup.seen(key):
+                return entry, key, DUPLICATE, True
+            return entry, key, dedup.claim(key), False
+        except Exception as e:
+            log.error("Dedup claim failed", messageId=message.message_id, error=str(e))
+            return entry, key, BUSY, False
+
+    to_process = []
+    keys = {}
+    busy = []
+    for (message_type, message), key, outcome, cached in run_parallel(claim, accepted, max_concurrency):
+        if outcome == CLAIMED:
+            to_process.append((message_type, message))
+            keys[message.message_id] = key
+        elif outcome == DUPLICATE:
+            log.sampled("Duplicate message skipped", messageId=message.message_id, dedupKey=key, cached=cached)
+            metrics.duplicate(message_type.name, cached)
+        else:
+            log.info("Message in progress elsewhere, retrying later", messageId=message.message_id, dedupKey=key)
+            busy.append(message.message_id)
+    return to_process, keys, busy
+
+def run_parallel(function, items, max_concurrency):
+    """map() on up to max_concurrency threads"""
+    workers = min(max_concurrency, len(items))
+    if workers <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
+
+def run_handler(message_type, messages, metrics):
+    """Call a type's handler on a sub-batch and return the failed message IDs"""
+    started = time.perf_counter()
+    try:
+        failed = list(message_type.handler(messages) or [])
+    except Exception as e:
+        log.error("Handler failed", messageType=message_type.name, messages=len(messages), error=str(e))
+        failed = [message.message_id for message in messages]
+    metrics.handler_call(message_type.name, len(messages), len(failed), time.perf_counter() - started)
+    return failed
@@ -0,0 +1,88 @@
+"""Benchmark for concurrent and bulk processing of an SQS batch.
+
+Replaces the registered handlers with ones that sleep for --latency-ms,
+standing in for a downstream call. The handler is then timed on a standard
+queue batch and on a FIFO batch spread over --groups message groups, in
+three setups:
+
+- serial: one call per message, MAX_CONCURRENCY=1 (the old loop)
+- concurrent: one call per message, --concurrency sub-batches in parallel
+- bulk: one call per sub-batch of up to 10 messages (e.g. BatchWriteItem)
+
+The time saved is Lambda duration billed for waiting.
+
+Run from the processor directory:
+
+    python -m benchmarks.concurrency --batch-size 10 --latency-ms 50 --groups 5
+"""
+import argparse
+import json
+import os
+import time
+
+import app
+import telemetry
+
+
+def simulated_io(latency):
+    def handler(messages):
+        time.sleep(latency)
+    return handler
+
+
+def standard_batch(size):
+    return [
+        {'messageId': f'm-{i}', 'body': json.dumps({'orderId': str(i), 'amount': 1.0})}
+        for i in range(size)
+    ]
+
+
+def fifo_batch(size, groups):
+    return [
+        {
+            'messageId': f'm-{i}',
+            'body': json.dumps({'transactionId': str(i), 'amount': 1.0}),
+            'attributes': {'MessageGroupId': f'group-{i % groups}'},
+        }
+        for i in range(size)
+    ]
+
+
+def measure(records, concurrency, batch_size, repeat):
+    app.MAX_CONCURRENCY = concurrency
+    for message_type in app.registry.types():
+        message_type.batch_size = batch_size
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = app.handler({'Records': records}, None)
+        assert not result['batchItemFailures']
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent SQS batch processing")
+    parser.add_argument("--batch-size", type=int, default=10, help="Messages per batch")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated I/O per handler call")
+    parser.add_argument("--groups", type=int, default=5, help="Message groups in the FIFO batch")
+    parser.add_argument("--concurrency", type=int, default=10, help="MAX_CONCURRENCY to compare")
+    parser.add_argument("--repeat", type=int, default=5, help="Batches per measurement")
+    args = parser.parse_args()
+
+    for message_type in app.registry.types():
+        message_type.handler = simulated_io(args.latency_ms / 1000)
+    telemetry.log.stream = open(os.devnull, 'w')  # keep logs and EMF output out of the timing
+
+    batches = {
+        'standard': standard_batch(args.batch_size),
+        f'fifo/{args.groups}g': fifo_batch(args.batch_size, args.groups),
+    }
+    print(f"{'queue':<12}{'serial ms':>12}{'concurrent ms':>15}{'bulk ms':>10}")
+    for name, records in batches.items():
+        serial = measure(records, 1, 1, args.repeat)
+        concurrent = measure(records, args.concurrency, 1, args.repeat)
+        bulk = measure(records, args.concurrency, 10, args.repeat)
+        print(f"{name:<12}{serial * 1000:>12.1f}{concurrent * 1000:>15.1f}{bulk * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Throughput benchmark for the ECS consumer.
+
+Fills a fresh queue with --messages orders, then drains it with the
+consumer, once per setup given as LOOPSxIN_FLIGHT:
+
+- 1x10: one receive loop, one batch at a time (a plain receive/process/
+  delete loop)
+- 1x100: one receive loop that keeps polling while batches are processed
+- 4x100: four concurrent long-poll loops
+
+The order handler sleeps --latency-ms per sub-batch, standing in for a
+downstream call. Reports messages per second and the SQS calls made.
+
+Needs a local SQS stand-in, e.g. ElasticMQ or moto's server:
+
+    docker run -d -p 9324:9324 softwaremill/elasticmq-native   # or: moto_server -p 9324
+    export SQS_ENDPOINT_URL=http://localhost:9324 AWS_DEFAULT_REGION=us-east-1 \\
+      AWS_ACCESS_KEY_ID=local AWS_SECRET_ACCESS_KEY=local
+
+Then, from the processor directory:
+
+    python -m benchmarks.consumer --messages 2000 --latency-ms 50 --setups 1x10,1x100,4x100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+import app
+import telemetry
+from benchmarks.dedup import count_calls
+from consumer import Consumer
+
+
+def simulated_io(latency):
+    def handler(messages):
+        time.sleep(latency)
+    return handler
+
+
+def fill_queue(sqs, queue_url, count):
+    def send(start):
+        sqs.send_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(i), 'MessageBody': json.dumps({'orderId': f'{start + i}', 'amount': 1.0})}
+            for i in range(min(10, count - start))
+        ])
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(send, range(0, count, 10)))
+
+
+async def drain(consumer, total):
+    """Run the consumer until `total` messages are deleted; returns seconds"""
+    run = asyncio.create_task(consumer.run())
+    started = time.perf_counter()
+    while consumer.stats['Deleted'] < total:
+        if run.done():
+            run.result()
+            raise RuntimeError("Consumer stopped early")
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    consumer.stop()
+    await run
+    return elapsed
+
+
+def measure(client, setup, args):
+    loops, in_flight = (int(n) for n in setup.split('x'))
+    queue_url = client.create_queue(QueueName=f'consumer-benchmark-{uuid.uuid4().hex[:8]}')['QueueUrl']
+    try:
+        fill_queue(client, queue_url, args.messages)
+        calls = count_calls(client)
+        consumer = Consumer(
+            client,
+            [queue_url],
+            receive_loops=loops,
+            max_in_flight=in_flight,
+            wait_time_seconds=args.wait_time,
+            visibility_timeout=30,
+            shutdown_timeout=args.wait_time + 5,
+        )
+        elapsed = asyncio.run(drain(consumer, args.messages))
+    finally:
+        client.delete_queue(QueueUrl=queue_url)
+    return {
+        'per_second': args.messages / elapsed,
+        'seconds': elapsed,
+        'receives': calls['ReceiveMessage'],
+        'deletes': calls['DeleteMessageBatch'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ECS SQS consumer")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages to drain per setup")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated I/O per handler call")
+    parser.add_argument("--setups", default="1x10,1x100,4x100", help="Comma-separated LOOPSxIN_FLIGHT")
+    parser.add_argument("--wait-time", type=int, default=1, help="WaitTimeSeconds of each receive")
+    args = parser.parse_args()
+
+    for message_type in app.registry.types():
+        message_type.handler = simulated_io(args.latency_ms / 1000)
+    telemetry.log.stream = open(os.devnull, 'w')  # keep logs and EMF output out of the timing
+
+    client = boto3.client(
+        'sqs',
+        endpoint_url=os.environ.get('SQS_ENDPOINT_URL'),
+        config=Config(max_pool_connections=200),
+    )
+    print(f"{'setup':<10}{'msg/s':>10}{'seconds':>10}{'receives':>10}{'deletes':>10}")
+    for setup in args.setups.split(','):
+        r = measure(client, setup, args)
+        print(f"{setup:<10}{r['per_second']:>10.0f}{r['seconds']:>10.2f}{r['receives']:>10}{r['deletes']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Redelivery benchmark for the dedup store.
+
+Delivers a batch of orders, then redelivers it --redeliveries times, as SQS
+does after a partial failure or a visibility timeout. Each batch is also
+sent with fresh messageIds, like a producer that retried its SendMessage.
+Reports how many messages the handler saw, how many were skipped as
+duplicates (and how many of those were answered by the in-memory cache),
+and the DynamoDB calls made. This is run once with the front cache and
+once without.
+
+Needs a local DynamoDB stand-in, e.g. DynamoDB Local or moto's server:
+
+    docker run -d -p 8001:8000 amazon/dynamodb-local   # or: moto_server -p 8001
+    export DYNAMODB_ENDPOINT_URL=http://localhost:8001 AWS_DEFAULT_REGION=us-east-1 \\
+      AWS_ACCESS_KEY_ID=local AWS_SECRET_ACCESS_KEY=local
+
+Then, from the processor directory:
+
+    python -m benchmarks.dedup --batch-size 10 --redeliveries 5
+"""
+import argparse
+import io
+import json
+import os
+import time
+import uuid
+from collections import Counter
+
+import boto3
+
+import app
+import telemetry
+from dedup import DedupStore
+
+
+def count_calls(client):
+    """A Counter of the API calls `client` makes from now on, by operation"""
+    calls = Counter()
+    client.meta.events.register('before-call', lambda model, **kwargs: calls.update([model.name]))
+    return calls
+
+
+def create_table(client, table_name):
+    client.create_table(
+        TableName=table_name,
+        AttributeDefinitions=[{'AttributeName': 'pk', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'pk', 'KeyType': 'HASH'}],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    client.get_waiter('table_exists').wait(TableName=table_name)
+
+
+def order_batch(size, run):
+    return [
+        {
+            'messageId': str(uuid.uuid4()),
+            'body': json.dumps({'orderId': f'{run}-{i}', 'amount': 1.0}),
+            'eventSourceARN': 'arn:aws:sqs:us-east-1:000000000000:orders',
+        }
+        for i in range(size)
+    ]
+
+
+def measure(client, table_name, cache_size, args):
+    calls = count_calls(client)
+    app.dedup = DedupStore(client, table_name, ttl_seconds=3600, in_progress_seconds=300, cache_size=cache_size)
+    handled = []
+    for message_type in app.registry.types():
+        message_type.handler = lambda messages: handled.extend(messages)
+
+    run = uuid.uuid4().hex[:8]
+    records = order_batch(args.batch_size, run)
+    telemetry.log.stream = output = io.StringIO()
+
+    started = time.perf_counter()
+    app.handler({'Records': records}, None)
+    for _ in range(args.redeliveries):
+        app.handler({'Records': records}, None)
+        # A producer retry: same orders, new messageIds
+        retried = [dict(record, messageId=str(uuid.uuid4())) for record in records]
+        app.handler({'Records': retried}, None)
+    elapsed = time.perf_counter() - started
+
+    documents = [json.loads(line) for line in output.getvalue().splitlines()]
+    totals = {'Duplicates': 0, 'DuplicatesFromCache': 0}
+    for document in documents:
+        if '_aws' in document and document.get('MessageType') == 'order':
+            for name in totals:
+                totals[name] += document[name]
+    delivered = args.batch_size * (1 + 2 * args.redeliveries)
+    return {
+        'delivered': delivered,
+        'handled': len(handled),
+        'duplicates': totals['Duplicates'],
+        'from_cache': totals['DuplicatesFromCache'],
+        'dynamodb_calls': sum(calls.values()),
+        'ms': elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQS deduplication")
+    parser.add_argument("--batch-size", type=int, default=10, help="Messages per batch")
+    parser.add_argument("--redeliveries", type=int, default=5, help="Times each batch is delivered again")
+    parser.add_argument("--table-name", default="dedup-benchmark")
+    args = parser.parse_args()
+
+    client = boto3.client('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL'))
+    if args.table_name not in client.list_tables()['TableNames']:
+        create_table(client, args.table_name)
+
+    print(f"{'front cache':<12}{'delivered':>10}{'handled':>9}{'dups':>7}{'cached':>8}{'ddb calls':>11}{'ms':>9}")
+    for name, cache_size in (('off', 0), ('on', 10000)):
+        r = measure(client, args.table_name, cache_size, args)
+        print(
+            f"{name:<12}{r['delivered']:>10}{r['handled']:>9}{r['duplicates']:>7}"
+            f"{r['from_cache']:>8}{r['dynamodb_calls']:>11}{r['ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
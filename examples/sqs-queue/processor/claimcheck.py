@@ -0,0 +1,151 @@
+"""S3 claim-check for SQS payloads too large for a message.
+
+Producers call send_message / send_message_batch. A body whose message
+would exceed the threshold (default: the 256 KiB SQS limit) is stored in
+S3, and the queue carries only a pointer. The format is the one used by
+the Amazon SQS Extended Client Library, so producers using that library
+work with this consumer and the other way round:
+
+    ["software.amazon.payloadoffloading.PayloadS3Pointer",
+     {"s3BucketName": "<bucket>", "s3Key": "<key>"}]
+
+plus an ExtendedPayloadSize message attribute holding the payload size.
+
+The processor turns pointers back into bodies with load(). The object is
+parsed straight from the S3 response stream with ijson when it is
+installed, so the raw document is never held in memory next to the
+parsed one. Payload objects are not deleted when a message is processed,
+since a redelivery still needs them. A bucket lifecycle rule expires them
+after the queue's retention period.
+
+Run as a script to send a JSON file through the claim-check:
+
+    python claimcheck.py --queue-url $ORDERS_QUEUE --bucket $PAYLOAD_BUCKET order.json
+"""
+import json
+import os
+import uuid
+
+try:
+    import ijson
+except ImportError:  # optional; falls back to json.load
+    ijson = None
+
+POINTER_CLASS = 'software.amazon.payloadoffloading.PayloadS3Pointer'
+SIZE_ATTRIBUTE = 'ExtendedPayloadSize'
+
+# Largest message SQS accepts, body and attributes included
+MAX_MESSAGE_BYTES = 262144
+
+_s3 = None
+
+def s3_client():
+    """Shared S3 client (S3_ENDPOINT_URL overrides the endpoint, e.g. for a local stand-in)"""
+    global _s3
+    if _s3 is None:
+        import boto3
+        _s3 = boto3.client('s3', endpoint_url=os.environ.get('S3_ENDPOINT_URL') or None)
+    return _s3
+
+def message_size(body, attributes=None):
+    """Bytes SQS counts against the message size limit"""
+    size = len(body.encode('utf-8'))
+    for name, attribute in (attributes or {}).items():
+        size += len(name.encode('utf-8')) + len(attribute['DataType'].encode('utf-8'))
+        if 'StringValue' in attribute:
+            size += len(attribute['StringValue'].encode('utf-8'))
+        else:
+            size += len(attribute.get('BinaryValue', b''))
+    return size
+
+def offload(body, attributes, bucket, threshold=MAX_MESSAGE_BYTES, prefix='', s3=None):
+    """Return (body, attributes) to send: unchanged if they fit within
+    threshold, otherwise a pointer to a copy of body stored in S3"""
+    if message_size(body, attributes) <= threshold:
+        return body, attributes
+    key = f"{prefix}{uuid.uuid4()}"
+    payload = body.encode('utf-8')
+    (s3 or s3_client()).put_object(Bucket=bucket, Key=key, Body=payload, ContentType='application/json')
+    reference = json.dumps([POINTER_CLASS, {'s3BucketName': bucket, 's3Key': key}])
+    attributes = dict(attributes or {})
+    attributes[SIZE_ATTRIBUTE] = {'DataType': 'Number', 'StringValue': str(len(payload))}
+    return reference, attributes
+
+def send_message(sqs, queue_url, body, bucket, threshold=MAX_MESSAGE_BYTES, s3=None, **kwargs):
+    """sqs.send_message with large bodies offloaded to S3.
+
+    `body` may be a str or anything json.dumps accepts. Other keyword
+    arguments (MessageGroupId, DelaySeconds, ...) are passed through.
+    """
+    if not isinstance(body, str):
+        body = json.dumps(body)
+    body, attributes = offload(body, kwargs.pop('MessageAttributes', None), bucket, threshold, s3=s3)
+    if attributes:
+        kwargs['MessageAttributes'] = attributes
+    return sqs.send_message(QueueUrl=queue_url, MessageBody=body, **kwargs)
+
+def send_message_batch(sqs, queue_url, entries, bucket, threshold=MAX_MESSAGE_BYTES, s3=None):
+    """sqs.send_message_batch with large bodies offloaded to S3.
+
+    A batch may hold at most 256 KiB in total, so entries are offloaded
+    until the batch fits, largest first.
+    """
+    entries = [dict(entry) for entry in entries]
+    for entry in entries:
+        body, attributes = offload(entry['MessageBody'], entry.get('MessageAttributes'), bucket, threshold, s3=s3)
+        entry['MessageBody'] = body
+        if attributes:
+            entry['MessageAttributes'] = attributes
+
+    sizes = [message_size(e['MessageBody'], e.get('MessageAttributes')) for e in entries]
+    inline = [i for i, entry in enumerate(entries) if pointer(entry['MessageBody']) is None]
+    while sum(sizes) > MAX_MESSAGE_BYTES and inline:
+        largest = max(inline, key=lambda i: sizes[i])
+        inline.remove(largest)
+        entry = entries[largest]
+        entry['MessageBody'], entry['MessageAttributes'] = offload(
+            entry['MessageBody'], entry.get('MessageAttributes'), bucket, threshold=0, s3=s3
+        )
+        sizes[largest] = message_size(entry['MessageBody'], entry['MessageAttributes'])
+    return sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+
+def pointer(body):
+    """(bucket, key) if a message body is a claim-check pointer, else None"""
+    if not body.lstrip().startswith(f'["{POINTER_CLASS}"'):
+        return None
+    _, location = json.loads(body)
+    return location['s3BucketName'], location['s3Key']
+
+def load(bucket, key, s3=None):
+    """Fetch and parse a payload. Returns (body, size in bytes)."""
+    response = (s3 or s3_client()).get_object(Bucket=bucket, Key=key)
+    stream = response['Body']
+    try:
+        if ijson is not None:
+            body = next(ijson.items(stream, '', use_float=True))
+        else:
+            body = json.load(stream)
+    finally:
+        stream.close()
+    return body, response['ContentLength']
+
+def main():
+    import argparse
+    import boto3
+
+    parser = argparse.ArgumentParser(description="Send a JSON document through the S3 claim-check")
+    parser.add_argument("--queue-url", required=True)
+    parser.add_argument("--bucket", required=True, help="Bucket for offloaded payloads")
+    parser.add_argument("--message-group-id", help="Required for FIFO queues")
+    parser.add_argument("--threshold", type=int, default=MAX_MESSAGE_BYTES, help="Offload messages larger than this")
+    parser.add_argument("file", help="JSON document to send")
+    args = parser.parse_args()
+
+    with open(args.file) as f:
+        body = f.read()
+    kwargs = {'MessageGroupId': args.message_group_id} if args.message_group_id else {}
+    response = send_message(boto3.client('sqs'), args.queue_url, body, args.bucket, args.threshold, **kwargs)
+    print(response['MessageId'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Long-running SQS consumer for ECS, an alternative to the Lambda processor.
+
+Messages go through the same pipeline as in Lambda (app.process_batch):
+handler registry, claim-check payloads, deduplication and metrics. What
+the event source mapping does for Lambda is done here:
+
+- RECEIVE_LOOPS long-poll loops per queue call ReceiveMessage concurrently,
+  waiting up to the queue's receive_wait_time_seconds
+  (RECEIVE_WAIT_TIME_SECONDS overrides it).
+- At most MAX_IN_FLIGHT messages are received and not yet finished. A loop
+  only polls for as many messages as there are free slots, so a slow
+  handler holds back receiving instead of piling up messages whose
+  visibility timeout runs out.
+- Each received batch is processed on a worker thread. While it runs, its
+  visibility timeout is extended every half timeout, so slow messages are
+  not redelivered to another consumer. With deduplication on, the batch's
+  dedup claims are extended every third of DEDUP_IN_PROGRESS_SECONDS too,
+  so a redelivery cannot claim a key that is still being processed.
+- Messages that succeeded are removed with one DeleteMessageBatch per batch.
+  Failed ones are left to reappear after their visibility timeout, as with
+  ReportBatchItemFailures.
+
+FIFO order holds without extra work: SQS does not hand out messages of a
+group while earlier ones of the group are in flight.
+
+On SIGTERM or SIGINT the loops stop receiving. Messages received after that
+are made visible again right away, and batches in progress get up to
+SHUTDOWN_TIMEOUT_SECONDS to finish. Set the ECS stopTimeout above it.
+
+    QUEUE_URLS=https://sqs.../orders,https://sqs.../transactions.fifo python consumer.py
+"""
+import asyncio
+import functools
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import app
+from telemetry import Metrics, log
+
+@dataclass(frozen=True)
+class Queue:
+    """A queue being consumed and the attributes the consumer needs"""
+    url: str
+    arn: str
+    name: str
+    visibility_timeout: int
+    wait_time_seconds: int
+
+class Consumer:
+    """Receives, processes and deletes messages of one or more queues"""
+
+    def __init__(self, sqs, queue_urls, receive_loops=2, max_in_flight=100,
+                 wait_time_seconds=None, visibility_timeout=None, shutdown_timeout=25):
+        self.sqs = sqs
+        self.queue_urls = queue_urls
+        self.receive_loops = receive_loops
+        self.max_in_flight = max_in_flight
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.stats = {'Received': 0, 'Deleted': 0, 'Failed': 0, 'Returned': 0, 'VisibilityExtended': 0, 'ClaimsExtended': 0}
+        self._executor = ThreadPoolExecutor(max_workers=len(queue_urls) * receive_loops + max_in_flight)
+        self._tasks = set()
+        self._stopping = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    @classmethod
+    def from_env(cls):
+        queue_urls = [url.strip() for url in os.environ.get('QUEUE_URLS', '').split(',') if url.strip()]
+        if not queue_urls:
+            raise ValueError("QUEUE_URLS must list at least one queue URL")
+        receive_loops = int(os.environ.get('RECEIVE_LOOPS', '2'))
+        max_in_flight = int(os.environ.get('MAX_IN_FLIGHT', '100'))
+        wait_time_seconds = os.environ.get('RECEIVE_WAIT_TIME_SECONDS')
+        visibility_timeout = os.environ.get('VISIBILITY_TIMEOUT_SECONDS')
+
+        import boto3
+        from botocore.config import Config
+
+        # One connection per receive loop and per batch in flight
+        config = Config(max_pool_connections=len(queue_urls) * receive_loops + max_in_flight)
+        sqs = boto3.client('sqs', endpoint_url=os.environ.get('SQS_ENDPOINT_URL') or None, config=config)
+        return cls(
+            sqs,
+            queue_urls,
+            receive_loops=receive_loops,
+            max_in_flight=max_in_flight,
+            wait_time_seconds=int(wait_time_seconds) if wait_time_seconds else None,
+            visibility_timeout=int(visibility_timeout) if visibility_timeout else None,
+            shutdown_timeout=float(os.environ.get('SHUTDOWN_TIMEOUT_SECONDS', '25')),
+        )
+
+    async def run(self):
+        """Consume until stop() is called or the process gets SIGTERM/SIGINT"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
+
+        queues = [await self._describe(url) for url in self.queue_urls]
+        receivers = [
+            asyncio.create_task(self._receive_loop(queue))
+            for queue in queues
+            for _ in range(self.receive_loops)
+        ]
+        log.info(
+            "Consumer started",
+            queues=[queue.name for queue in queues],
+            receiveLoops=self.receive_loops,
+            maxInFlight=self.max_in_flight,
+        )
+
+        await self._stopping.wait()
+        log.info("Consumer stopping", batchesInFlight=len(self._tasks))
+        _, pending = await asyncio.wait(receivers + list(self._tasks), timeout=self.shutdown_timeout)
+        if pending:
+            log.error("Shutdown timed out, unfinished messages will be redelivered", tasks=len(pending))
+            for task in pending:
+                task.cancel()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(signum)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        log.info("Consumer stopped", **self.stats)
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _call(self, function, *args, **kwargs):
+        """Run a blocking call (boto3, handlers) on the consumer's threads"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs)
+        )
+
+    async def _describe(self, url):
+        attributes = (await self._call(
+            self.sqs.get_queue_attributes,
+            QueueUrl=url,
+            AttributeNames=['QueueArn', 'VisibilityTimeout', 'ReceiveMessageWaitTimeSeconds'],
+        ))['Attributes']
+        arn = attributes['QueueArn']
+        return Queue(
+            url=url,
+            arn=arn,
+            name=arn.rsplit(':', 1)[-1],
+            visibility_timeout=self.visibility_timeout or int(attributes['VisibilityTimeout']),
+            wait_time_seconds=(
+                self.wait_time_seconds if self.wait_time_seconds is not None
+                else int(attributes.get('ReceiveMessageWaitTimeSeconds', '0'))
+            ),
+        )
+
+    async def _reserve(self):
+        """Wait for a free in-flight slot, then take up to 10 (one receive)"""
+        await self._slots.acquire()
+        reserved = 1
+        while reserved < 10 and not self._slots.locked():
+            await self._slots.acquire()
+            reserved += 1
+        return reserved
+
+    def _release(self, count):
+        for _ in range(count):
+            self._slots.release()
+
+    async def _receive_loop(self, queue):
+        errors = 0
+        while not self._stopping.is_set():
+            reserved = await self._reserve()
+            if self._stopping.is_set():
+                self._release(reserved)
+                break
+            try:
+                response = await self._call(
+                    self.sqs.receive_message,
+                    QueueUrl=queue.url,
+                    MaxNumberOfMessages=reserved,
+                    WaitTimeSeconds=queue.wait_time_seconds,
+                    VisibilityTimeout=queue.visibility_timeout,
+                    AttributeNames=['All'],
+                    MessageAttributeNames=['All'],
+                )
+                errors = 0
+            except Exception as e:
+                self._release(reserved)
+                errors += 1
+                log.error("Receive failed", queue=queue.name, error=str(e))
+                await self._pause(min(2 ** errors, 30))
+                continue
+
+            messages = response.get('Messages', [])
+            self._release(reserved - len(messages))
+            if not messages:
+                continue
+            self.stats['Received'] += len(messages)
+            if self._stopping.is_set():
+                await self._return(queue, messages)
+                self._release(len(messages))
+                break
+            task = asyncio.create_task(self._process(queue, messages))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _pause(self, seconds):
+        """Sleep, but wake up early when stopping"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, queue, messages):
+        records = [to_record(message, queue) for message in messages]
+        metrics = Metrics(app.METRICS_NAMESPACE, queue.name)
+        claims = set()
+        heartbeats = [asyncio.create_task(self._extend_visibility(queue, messages))]
+        if app.dedup is not None:
+            heartbeats.append(asyncio.create_task(self._extend_claims(queue, claims)))
+        try:
+            failed = await self._call(app.process_batch, records, app.MAX_CONCURRENCY, metrics, claims)
+        except Exception as e:
+            log.error("Batch failed", queue=queue.name, messages=len(messages), error=str(e))
+            failed = [record['messageId'] for record in records]
+        finally:
+            for heartbeat in heartbeats:
+                heartbeat.cancel()
+
+        metrics.batch(len(records), len(failed))
+        metrics.flush()
+        failed = set(failed)
+        self.stats['Failed'] += len(failed)
+        try:
+            await self._delete(queue, [message for message in messages if message['MessageId'] not in failed])
+        finally:
+            self._release(len(messages))
+        log.sampled("Batch processed", queue=queue.name, messages=len(records), failed=len(failed))
+
+    async def _extend_visibility(self, queue, messages):
+        """Push the batch's visibility timeout out every half timeout while
+        it is being processed"""
+        while True:
+            await asyncio.sleep(queue.visibility_timeout / 2)
+            failed = await self._change_visibility(queue, messages, queue.visibility_timeout)
+            self.stats['VisibilityExtended'] += len(messages) - len(failed)
+            for message_id, error in failed:
+                log.error("Could not extend visibility timeout", queue=queue.name, messageId=message_id, error=error)
+
+    async def _extend_claims(self, queue, claims):
+        """Push out the expiry of the batch's dedup claims every third of
+        their lifetime while it is being processed"""
+        while True:
+            await asyncio.sleep(app.dedup.in_progress_seconds / 3)
+            keys = list(claims)
+            try:
+                await self._call(app.dedup.extend, keys)
+            except Exception as e:
+                log.error("Could not extend dedup claims", queue=queue.name, keys=len(keys), error=str(e))
+                continue
+            self.stats['ClaimsExtended'] += len(keys)
+
+    async def _return(self, queue, messages):
+        """Make messages received during shutdown visible again right away"""
+        await self._change_visibility(queue, messages, 0)
+        self.stats['Returned'] += len(messages)
+
+    async def _change_visibility(self, queue, messages, timeout):
+        """ChangeMessageVisibilityBatch; returns (messageId, error) of failures"""
+        entries = [
+            {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle'], 'VisibilityTimeout': timeout}
+            for index, message in enumerate(messages)
+        ]
+        try:
+            response = await self._call(self.sqs.change_message_visibility_batch, QueueUrl=queue.url, Entries=entries)
+        except Exception as e:
+            return [(message['MessageId'], str(e)) for message in messages]
+        return [(messages[int(entry['Id'])]['MessageId'], entry.get('Message')) for entry in response.get('Failed', [])]
+
+    async def _delete(self, queue, messages):
+        if not messages:
+            return
+        entries = [
+            {'Id': str(index), 'ReceiptHandle': message['ReceiptHandle']}
+            for index, message in enumerate(messages)
+        ]
+        try:
+            response = await self._call(self.sqs.delete_message_batch, QueueUrl=queue.url, Entries=entries)
+        except Exception as e:
+            log.error("Delete failed, messages will be redelivered", queue=queue.name, messages=len(messages), error=str(e))
+            return
+        failed = response.get('Failed', [])
+        for entry in failed:
+            log.error(
+                "Delete failed, message will be redelivered",
+                queue=queue.name,
+                messageId=messages[int(entry['Id'])]['MessageId'],
+                error=entry.get('Message'),
+            )
+        self.stats['Deleted'] += len(messages) - len(failed)
+
+def to_record(message, queue):
+    """A ReceiveMessage message in the shape of a Lambda SQS event record,
+    which is what the processor pipeline expects"""
+    return {
+        'messageId': message['MessageId'],
+        'receiptHandle': message['ReceiptHandle'],
+        'body': message['Body'],
+        'attributes': message.get('Attributes', {}),
+        'messageAttributes': {
+            name: {key[0].lower() + key[1:]: value for key, value in attribute.items()}
+            for name, attribute in message.get('MessageAttributes', {}).items()
+        },
+        'md5OfBody': message.get('MD5OfBody'),
+        'eventSource': 'aws:sqs',
+        'eventSourceARN': queue.arn,
+    }
+
+def main():
+    asyncio.run(Consumer.from_env().run())
+
+if __name__ == '__main__':
+    main()
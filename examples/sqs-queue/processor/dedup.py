@@ -0,0 +1,178 @@
+"""Deduplication of SQS messages across redeliveries and producer retries.
+
+Each message gets a dedup key: its business key ("order#<orderId>") or its
+messageId (DEDUP_KEY=message). Before the handler runs, the key is claimed
+with a conditional PutItem that only succeeds if no unexpired record holds
+it. The claim expires after DEDUP_IN_PROGRESS_SECONDS, so a crashed
+invocation does not block the key for longer. Keep it above the function
+timeout: a claim that expires while its run is still going lets a
+redelivery of the message run at the same time. The ECS consumer has no
+timeout and extends the claims of a batch while it runs instead. After the handler returns,
+keys of messages that succeeded are marked completed until
+DEDUP_TTL_SECONDS, and keys of failed messages are released for the retry.
+Both are done with BatchWriteItem.
+
+Keys completed by this container are also kept in an in-memory LRU, so a
+redelivery to a warm container is skipped without a DynamoDB call.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from telemetry import log
+
+COMPLETED = 'COMPLETED'
+IN_PROGRESS = 'IN_PROGRESS'
+
+# Claim outcomes
+CLAIMED = 'claimed'
+DUPLICATE = 'duplicate'
+BUSY = 'busy'
+
+class DedupStore:
+    """Claims and completes dedup keys in a DynamoDB table keyed by "pk"
+    with TTL on "expires_at" """
+
+    def __init__(self, client, table_name, ttl_seconds, in_progress_seconds, cache_size, key_mode='business'):
+        self.client = client
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.in_progress_seconds = in_progress_seconds
+        self.cache_size = cache_size
+        self.key_mode = key_mode
+        self._completed = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """The store configured by DEDUP_TABLE_NAME, or None if unset"""
+        table_name = os.environ.get('DEDUP_TABLE_NAME')
+        if not table_name:
+            return None
+        key_mode = os.environ.get('DEDUP_KEY', 'business')
+        if key_mode not in ('business', 'message'):
+            raise ValueError(f"DEDUP_KEY must be 'business' or 'message', got {key_mode!r}")
+
+        import boto3
+        client = boto3.client('dynamodb', endpoint_url=os.environ.get('DYNAMODB_ENDPOINT_URL') or None)
+        return cls(
+            client,
+            table_name,
+            ttl_seconds=int(os.environ.get('DEDUP_TTL_SECONDS', '86400')),
+            in_progress_seconds=int(os.environ.get('DEDUP_IN_PROGRESS_SECONDS', '360')),
+            cache_size=int(os.environ.get('DEDUP_CACHE_SIZE', '10000')),
+            key_mode=key_mode,
+        )
+
+    def key(self, message_type, message):
+        if self.key_mode == 'business':
+            return f"{message_type.name}#{message.body[message_type.key]}"
+        return f"message#{message.message_id}"
+
+    def seen(self, key):
+        """True if this container completed `key` and it has not expired"""
+        with self._lock:
+            expires_at = self._completed.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._completed[key]
+                return False
+            self._completed.move_to_end(key)
+            return True
+
+    def _remember(self, key, expires_at):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._completed[key] = expires_at
+            self._completed.move_to_end(key)
+            while len(self._completed) > self.cache_size:
+                self._completed.popitem(last=False)
+
+    def claim(self, key):
+        """Claim `key` for processing.
+
+        Returns CLAIMED, DUPLICATE if it was already completed, or BUSY if
+        another invocation holds an unexpired claim on it.
+        """
+        now = int(time.time())
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'pk': {'S': key},
+                    'status': {'S': IN_PROGRESS},
+                    'expires_at': {'N': str(now + self.in_progress_seconds)},
+                },
+                ConditionExpression='attribute_not_exists(pk) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            )
+            return CLAIMED
+        except self.client.exceptions.ConditionalCheckFailedException as e:
+            existing = e.response.get('Item', {})
+            if existing.get('status', {}).get('S') == COMPLETED:
+                self._remember(key, int(existing['expires_at']['N']))
+                return DUPLICATE
+            return BUSY
+
+    def extend(self, keys):
+        """Push out the expiry of claims that are still in progress, for runs
+        that take longer than in_progress_seconds"""
+        expires_at = int(time.time()) + self.in_progress_seconds
+        for key in keys:
+            try:
+                self.client.update_item(
+                    TableName=self.table_name,
+                    Key={'pk': {'S': key}},
+                    UpdateExpression='SET expires_at = :expires_at',
+                    ConditionExpression='#status = :in_progress',
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues={
+                        ':expires_at': {'N': str(expires_at)},
+                        ':in_progress': {'S': IN_PROGRESS},
+                    },
+                )
+            except self.client.exceptions.ConditionalCheckFailedException:
+                pass  # completed or released in the meantime
+
+    def complete(self, keys):
+        """Mark keys whose messages were processed"""
+        expires_at = int(time.time()) + self.ttl_seconds
+        self._write([
+            {'PutRequest': {'Item': {
+                'pk': {'S': key},
+                'status': {'S': COMPLETED},
+                'expires_at': {'N': str(expires_at)},
+            }}}
+            for key in keys
+        ])
+        for key in keys:
+            self._remember(key, expires_at)
+
+    def release(self, keys):
+        """Drop the claims of messages that failed, so their retry can run"""
+        self._write([{'DeleteRequest': {'Key': {'pk': {'S': key}}}} for key in keys])
+
+    def _write(self, requests, max_attempts=3):
+        """BatchWriteItem in chunks of 25, retrying unprocessed items.
+
+        Writes that still fail are logged and dropped: an unwritten
+        completion or release only means the claim expires on its own.
+        """
+        for start in range(0, len(requests), 25):
+            pending = requests[start:start + 25]
+            for attempt in range(max_attempts):
+                try:
+                    response = self.client.batch_write_item(RequestItems={self.table_name: pending})
+                except Exception as e:
+                    log.error("Dedup write failed", items=len(pending), error=str(e))
+                    break
+                pending = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                if not pending:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                log.error("Dedup write left unprocessed items", items=len(pending))
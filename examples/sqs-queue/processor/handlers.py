@@ -0,0 +1,21 @@
+from registry import HandlerRegistry
+from telemetry import log
+
+registry = HandlerRegistry()
+
+@registry.register('order', key='orderId', schema={'orderId': (str, int), 'amount': (int, float)}, batch_size=10)
+def process_orders(orders):
+    """Process a sub-batch of up to 10 order messages"""
+    for order in orders:
+        log.sampled("Processing order", orderId=order.body['orderId'], amount=order.body['amount'])
+    # Add your order processing logic here, e.g. one BatchWriteItem for the
+    # whole sub-batch. Return the message IDs of orders that failed.
+    return []
+
+@registry.register('transaction', key='transactionId', schema={'transactionId': (str, int), 'amount': (int, float)}, batch_size=1)
+def process_transactions(transactions):
+    """Process transaction messages one at a time"""
+    for transaction in transactions:
+        log.sampled("Processing transaction", transactionId=transaction.body['transactionId'], amount=transaction.body['amount'])
+    # Add your transaction processing logic here
+    return []
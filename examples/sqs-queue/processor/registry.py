@@ -0,0 +1,133 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+from telemetry import log
+
+@dataclass(frozen=True)
+class Message:
+    """A parsed SQS record handed to a message handler"""
+    message_id: str
+    body: dict
+    record: dict = field(repr=False)
+
+class MessageType:
+    """A registered message type: how to recognise it, what it must contain
+    and the handler that processes sub-batches of it"""
+
+    def __init__(self, name, key, schema, batch_size, handler):
+        self.name = name
+        self.key = key
+        self.schema = schema
+        self.batch_size = batch_size
+        self.handler = handler
+
+    def validate(self, body):
+        """Return a description of the first schema violation, or None"""
+        for name, types in self.schema.items():
+            if name not in body:
+                return f"missing field '{name}'"
+            value = body[name]
+            accepted = types if isinstance(types, tuple) else (types,)
+            # bool is an int subclass; only accept it where asked for
+            if not isinstance(value, accepted) or (isinstance(value, bool) and bool not in accepted):
+                return f"field '{name}' has type {type(value).__name__}"
+        return None
+
+class HandlerRegistry:
+    """Message types and their batch handlers.
+
+    A handler takes a list of Message objects of its type (at most
+    batch_size) so it can write them downstream in bulk. It returns the
+    message IDs that failed (None or an empty list if all succeeded) and
+    raises to fail the whole sub-batch.
+    """
+
+    def __init__(self):
+        self._types = {}
+
+    def register(self, name, key, schema, batch_size=10):
+        """Decorator registering a handler for messages named `name`.
+
+        A message has this type if its body has "type": name, or failing
+        that, if it contains the `key` field. `schema` maps required fields
+        to the accepted Python type(s) after JSON decoding, and must include
+        `key`, which deduplication relies on.
+        """
+        if key not in schema:
+            raise ValueError(f"schema of {name!r} must include its key field {key!r}")
+        def decorator(handler):
+            self._types[name] = MessageType(name, key, schema, batch_size, handler)
+            return handler
+        return decorator
+
+    def types(self):
+        return list(self._types.values())
+
+    def resolve(self, body):
+        """The MessageType for a decoded body, or None if unknown"""
+        if not isinstance(body, dict):
+            return None
+        message_type = self._types.get(body.get('type'))
+        if message_type is not None:
+            return message_type
+        for message_type in self._types.values():
+            if message_type.key in body:
+                return message_type
+        return None
+
+def log_sink(messages):
+    """Log unknown messages and drop them"""
+    for message in messages:
+        log.error("Unknown message type, dropped", messageId=message.message_id, body=log.body(message.body))
+    return []
+
+def fail_sink(messages):
+    """Report unknown messages as failed, so they end up in the DLQ"""
+    for message in messages:
+        log.error("Unknown message type, left for the DLQ", messageId=message.message_id, body=log.body(message.body))
+    return [message.message_id for message in messages]
+
+def queue_sink(queue_url, sqs_client=None):
+    """Forward unknown messages to another SQS queue"""
+    if sqs_client is None:
+        import boto3
+        sqs_client = boto3.client('sqs')
+
+    def sink(messages):
+        failed = []
+        for start in range(0, len(messages), 10):
+            chunk = messages[start:start + 10]
+            response = sqs_client.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {
+                        'Id': str(index),
+                        'MessageBody': json.dumps(message.body),
+                        'MessageAttributes': {
+                            'SourceMessageId': {'DataType': 'String', 'StringValue': message.message_id},
+                            'SourceQueueArn': {'DataType': 'String', 'StringValue': message.record.get('eventSourceARN', 'unknown')},
+                        },
+                    }
+                    for index, message in enumerate(chunk)
+                ],
+            )
+            for entry in response.get('Failed', []):
+                message = chunk[int(entry['Id'])]
+                log.error("Could not forward unknown message", messageId=message.message_id, error=entry.get('Message'))
+                failed.append(message.message_id)
+        return failed
+
+    return sink
+
+def unknown_sink_from_env():
+    """Sink for messages of no registered type, from UNKNOWN_MESSAGE_SINK:
+    "log" (default), "fail", or the URL of a queue to forward them to"""
+    setting = os.environ.get('UNKNOWN_MESSAGE_SINK', 'log')
+    if setting == 'log':
+        return log_sink
+    if setting == 'fail':
+        return fail_sink
+    if setting.startswith('https://'):
+        return queue_sink(setting)
+    raise ValueError(f"UNKNOWN_MESSAGE_SINK must be 'log', 'fail' or a queue URL, got {setting!r}")
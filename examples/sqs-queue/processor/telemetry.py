@@ -0,0 +1,187 @@
+"""Structured logging and CloudWatch Embedded Metric Format (EMF) metrics.
+
+Logs are single-line JSON on stdout (log.stream). Routine per-message lines are sampled
+(LOG_SAMPLE_RATE) and message bodies are redacted and truncated, so log
+volume does not grow with traffic. Errors are always logged.
+
+Metrics are collected for one invocation and written in handler() as EMF
+documents, one line per dimension set. CloudWatch Logs extracts them into
+metrics, so no PutMetricData calls are made. They go through the same
+stream as the logs.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+REDACTED = '[REDACTED]'
+
+class Logger:
+    """JSON line logger with sampling and body redaction"""
+
+    def __init__(self, sample_rate, body_mode, max_body_chars, redact_fields, stream=None):
+        self.sample_rate = sample_rate
+        self.body_mode = body_mode
+        self.max_body_chars = max_body_chars
+        self.redact_fields = frozenset(redact_fields)
+        self.stream = stream  # file the lines go to; None is sys.stdout
+        self.context = {}
+
+    @classmethod
+    def from_env(cls):
+        body_mode = os.environ.get('LOG_BODY', 'truncate')
+        if body_mode not in ('none', 'truncate', 'full'):
+            raise ValueError(f"LOG_BODY must be 'none', 'truncate' or 'full', got {body_mode!r}")
+        return cls(
+            sample_rate=float(os.environ.get('LOG_SAMPLE_RATE', '0.01')),
+            body_mode=body_mode,
+            max_body_chars=int(os.environ.get('LOG_BODY_MAX_CHARS', '256')),
+            redact_fields=[f.strip() for f in os.environ.get('LOG_REDACT_FIELDS', '').split(',') if f.strip()],
+        )
+
+    def write(self, document):
+        """Write a document as one JSON line"""
+        print(json.dumps(document, default=str), file=self.stream)
+
+    def _emit(self, level, message, fields):
+        self.write({'level': level, 'message': message, **self.context, **fields})
+
+    def info(self, message, **fields):
+        self._emit('INFO', message, fields)
+
+    def error(self, message, **fields):
+        self._emit('ERROR', message, fields)
+
+    def sampled(self, message, **fields):
+        """Log at INFO for a LOG_SAMPLE_RATE fraction of calls"""
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            self._emit('INFO', message, {**fields, 'sampled': True})
+
+    def body(self, body):
+        """A message body as it may appear in logs (None if bodies are off)"""
+        if self.body_mode == 'none':
+            return None
+        body = self._redact(body)
+        if self.body_mode == 'full':
+            return body
+        text = body if isinstance(body, str) else json.dumps(body, default=str)
+        if len(text) > self.max_body_chars:
+            return text[:self.max_body_chars] + f'...[{len(text) - self.max_body_chars} more chars]'
+        return text
+
+    def _redact(self, value):
+        if not self.redact_fields:
+            return value
+        if isinstance(value, dict):
+            return {
+                k: REDACTED if k in self.redact_fields else self._redact(v)
+                for k, v in value.items()
+            }
+        if isinstance(value, list):
+            return [self._redact(v) for v in value]
+        return value
+
+# Shared by the processor modules
+log = Logger.from_env()
+
+class Metrics:
+    """Counters and latencies for one invocation, written as EMF.
+
+    Thread-safe, since handlers run on worker threads.
+    """
+
+    def __init__(self, namespace, queue):
+        self.namespace = namespace
+        self.queue = queue
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._batch = {'Messages': 0, 'Failed': 0, 'LargePayloads': 0, 'LargePayloadBytes': 0}
+        self._payload_latency = []
+        self._types = {}
+
+    def batch(self, messages, failed):
+        with self._lock:
+            self._batch['Messages'] += messages
+            self._batch['Failed'] += failed
+
+    def large_payload(self, size, seconds):
+        """A claim-check payload loaded from S3"""
+        with self._lock:
+            self._batch['LargePayloads'] += 1
+            self._batch['LargePayloadBytes'] += size
+            self._payload_latency.append(round(seconds * 1000, 3))
+
+    def handler_call(self, message_type, messages, failed, seconds):
+        """Record one handler call on a sub-batch"""
+        with self._lock:
+            totals = self._type_totals(message_type)
+            totals['Processed'] += messages - failed
+            totals['Failed'] += failed
+            totals['HandlerLatency'].append(round(seconds * 1000, 3))
+
+    def rejected(self, message_type, count=1):
+        """Messages that never reached a handler (unparsable, invalid, unknown)"""
+        with self._lock:
+            self._type_totals(message_type)['Rejected'] += count
+
+    def duplicate(self, message_type, cached):
+        """A message skipped as already processed, found in the in-memory
+        cache (cached) or in the dedup table"""
+        with self._lock:
+            totals = self._type_totals(message_type)
+            totals['Duplicates'] += 1
+            totals['DuplicatesFromCache'] += cached
+
+    def _type_totals(self, message_type):
+        return self._types.setdefault(message_type, {
+            'Processed': 0, 'Failed': 0, 'Rejected': 0,
+            'Duplicates': 0, 'DuplicatesFromCache': 0, 'HandlerLatency': [],
+        })
+
+    def documents(self):
+        timestamp = int(time.time() * 1000)
+        duration = round((time.perf_counter() - self.started) * 1000, 3)
+        batch = {
+            'Messages': (self._batch['Messages'], 'Count'),
+            'Failed': (self._batch['Failed'], 'Count'),
+            'BatchDuration': (duration, 'Milliseconds'),
+        }
+        if self._payload_latency:
+            batch['LargePayloads'] = (self._batch['LargePayloads'], 'Count')
+            batch['LargePayloadBytes'] = (self._batch['LargePayloadBytes'], 'Bytes')
+            batch['LargePayloadLatency'] = (self._payload_latency[:100], 'Milliseconds')
+        documents = [self._document(timestamp, ['Queue'], batch, {})]
+        for message_type, totals in self._types.items():
+            values = {
+                'Processed': (totals['Processed'], 'Count'),
+                'Failed': (totals['Failed'], 'Count'),
+                'Rejected': (totals['Rejected'], 'Count'),
+                'Duplicates': (totals['Duplicates'], 'Count'),
+                'DuplicatesFromCache': (totals['DuplicatesFromCache'], 'Count'),
+            }
+            if totals['HandlerLatency']:
+                # EMF accepts up to 100 values per metric and document
+                values['HandlerLatency'] = (totals['HandlerLatency'][:100], 'Milliseconds')
+            documents.append(self._document(timestamp, ['Queue', 'MessageType'], values, {'MessageType': message_type}))
+        return documents
+
+    def _document(self, timestamp, dimensions, values, dimension_values):
+        return {
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [dimensions],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in values.items()],
+                }],
+            },
+            'Queue': self.queue,
+            **dimension_values,
+            **{name: value for name, (value, _) in values.items()},
+        }
+
+    def flush(self):
+        """Write the EMF documents to the log stream"""
+        for document in self.documents():
+            log.write(document)
@@ -0,0 +1,134 @@
+# Long-running consumer on ECS, an alternative to the Lambda processor for
+# sustained high volume. With enable_ecs_consumer the Lambda event source
+# mappings are disabled, so only the consumer receives from the queues.
+
+data "aws_availability_zones" "available" {
+  state = "available"
+}
+
+module "vpc" {
+  count  = var.enable_ecs_consumer ? 1 : 0
+  source = "../../../modules/vpc"
+
+  name               = "${var.project_name}-vpc"
+  cidr               = "10.0.0.0/16"
+  azs                = slice(data.aws_availability_zones.available.names, 0, 2)
+  private_subnets    = ["10.0.1.0/24", "10.0.2.0/24"]
+  public_subnets     = ["10.0.101.0/24", "10.0.102.0/24"]
+  enable_nat_gateway = true
+  single_nat_gateway = true
+
+  tags = var.tags
+}
+
+# The consumer only makes outbound calls to AWS APIs
+resource "aws_security_group" "consumer" {
+  count       = var.enable_ecs_consumer ? 1 : 0
+  name        = "${var.project_name}-consumer"
+  description = "Security group for the SQS consumer tasks"
+  vpc_id      = module.vpc[0].vpc_id
+
+  egress {
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_log_group" "consumer" {
+  count             = var.enable_ecs_consumer ? 1 : 0
+  name              = "/ecs/${var.project_name}-consumer"
+  retention_in_days = 7
+
+  tags = var.tags
+}
+
+resource "aws_iam_role" "consumer_execution" {
+  count = var.enable_ecs_consumer ? 1 : 0
+  name  = "${var.project_name}-consumer-execution"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Action = "sts:AssumeRole"
+      Effect = "Allow"
+      Principal = {
+        Service = "ecs-tasks.amazonaws.com"
+      }
+    }]
+  })
+
+  tags = var.tags
+}
+
+resource "aws_iam_role_policy_attachment" "consumer_execution" {
+  count      = var.enable_ecs_consumer ? 1 : 0
+  role       = aws_iam_role.consumer_execution[0].name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy"
+}
+
+resource "aws_iam_role" "consumer_task" {
+  count = var.enable_ecs_consumer ? 1 : 0
+  name  = "${var.project_name}-consumer-task"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Action = "sts:AssumeRole"
+      Effect = "Allow"
+      Principal = {
+        Service = "ecs-tasks.amazonaws.com"
+      }
+    }]
+  })
+
+  tags = var.tags
+}
+
+resource "aws_iam_role_policy" "consumer_task" {
+  count = var.enable_ecs_consumer ? 1 : 0
+  name  = "sqs-access"
+  role  = aws_iam_role.consumer_task[0].id
+
+  policy = local.processor_policy
+}
+
+module "consumer" {
+  count  = var.enable_ecs_consumer ? 1 : 0
+  source = "../../../modules/ecs"
+
+  cluster_name       = "${var.project_name}-consumer"
+  task_family        = "${var.project_name}-consumer"
+  service_name       = "${var.project_name}-consumer"
+  container_name     = "consumer"
+  container_image    = "${module.ecr.repository_url}:consumer-latest"
+  cpu                = var.consumer_cpu
+  memory             = var.consumer_memory
+  execution_role_arn = aws_iam_role.consumer_execution[0].arn
+  task_role_arn      = aws_iam_role.consumer_task[0].arn
+  subnet_ids         = module.vpc[0].private_subnet_ids
+  security_group_ids = [aws_security_group.consumer[0].id]
+  log_group_name     = aws_cloudwatch_log_group.consumer[0].name
+  aws_region         = var.aws_region
+
+  # SHUTDOWN_TIMEOUT_SECONDS plus a margin; 120 is the Fargate maximum
+  stop_timeout = 120
+
+  environment_variables = [
+    for name, value in merge(local.processor_environment, {
+      QUEUE_URLS               = join(",", [module.orders_queue.queue_url, module.transactions_queue.queue_url])
+      RECEIVE_LOOPS            = tostring(var.consumer_receive_loops)
+      MAX_IN_FLIGHT            = tostring(var.consumer_max_in_flight)
+      SHUTDOWN_TIMEOUT_SECONDS = "100"
+    }) : { name = name, value = value }
+  ]
+
+  enable_autoscaling       = true
+  autoscaling_min_capacity = 1
+  autoscaling_max_capacity = var.consumer_max_tasks
+
+  tags = var.tags
+}
@@ -38,12 +38,143 @@ module "transactions_queue" {
   content_based_deduplication = true
 
   visibility_timeout_seconds = 300
-  
+  receive_wait_time_seconds  = 20
+
   create_dlq = true
 
   tags = var.tags
 }
 
+# Messages of no registered type, forwarded by the processor for inspection
+module "unknown_queue" {
+  source = "../../../modules/sqs"
+
+  queue_name = "${var.project_name}-unknown"
+
+  create_dlq = false
+
+  tags = var.tags
+}
+
+# Dedup keys of processed messages, expired by TTL
+module "dedup_table" {
+  source = "../../../modules/dynamodb"
+
+  table_name        = "${var.project_name}-dedup"
+  hash_key          = "pk"
+  billing_mode      = "PAY_PER_REQUEST"
+  enable_encryption = true
+
+  ttl_enabled        = true
+  ttl_attribute_name = "expires_at"
+
+  tags = var.tags
+}
+
+# Claim-check payloads too large for an SQS message
+resource "aws_s3_bucket" "payloads" {
+  bucket        = "${var.project_name}-payloads-${data.aws_caller_identity.current.account_id}"
+  force_destroy = true
+
+  tags = var.tags
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Payloads are kept until their message can no longer be delivered,
+# including from a DLQ redrive (14 days)
+resource "aws_s3_bucket_lifecycle_configuration" "payloads" {
+  bucket = aws_s3_bucket.payloads.id
+
+  rule {
+    id     = "expire-payloads"
+    status = "Enabled"
+
+    filter {}
+
+    expiration {
+      days = var.payload_retention_days
+    }
+  }
+}
+
+# Permissions and settings shared by the Lambda processor and the ECS consumer
+locals {
+  processor_timeout = 300
+
+  processor_policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = [
+          module.orders_queue.queue_arn,
+          module.transactions_queue.queue_arn
+        ]
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["sqs:SendMessage"]
+        Resource = [module.unknown_queue.queue_arn]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem"
+        ]
+        Resource = [module.dedup_table.table_arn]
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = ["${aws_s3_bucket.payloads.arn}/*"]
+      }
+    ]
+  })
+
+  processor_environment = {
+    ENVIRONMENT          = var.environment
+    MAX_CONCURRENCY      = tostring(var.max_concurrency)
+    UNKNOWN_MESSAGE_SINK = module.unknown_queue.queue_url
+    LOG_SAMPLE_RATE      = tostring(var.log_sample_rate)
+    LOG_BODY             = var.log_body
+    LOG_REDACT_FIELDS    = join(",", var.log_redact_fields)
+    METRICS_NAMESPACE    = var.project_name
+    DEDUP_TABLE_NAME     = module.dedup_table.table_name
+    DEDUP_TTL_SECONDS    = tostring(var.dedup_ttl_seconds)
+
+    # Claims must outlive a run that hits the timeout, or a redelivery
+    # could claim the key while the first run is still going
+    DEDUP_IN_PROGRESS_SECONDS = tostring(local.processor_timeout + 60)
+  }
+}
+
 # Lambda processor
 module "ecr" {
   source = "../../../modules/ecr"
@@ -81,23 +212,7 @@ resource "aws_iam_role_policy" "lambda_sqs" {
   name = "sqs-access"
   role = aws_iam_role.lambda.id
 
-  policy = jsonencode({
-    Version = "2012-10-17"
-    Statement = [
-      {
-        Effect = "Allow"
-        Action = [
-          "sqs:ReceiveMessage",
-          "sqs:DeleteMessage",
-          "sqs:GetQueueAttributes"
-        ]
-        Resource = [
-          module.orders_queue.queue_arn,
-          module.transactions_queue.queue_arn
-        ]
-      }
-    ]
-  })
+  policy = local.processor_policy
 }
 
 module "lambda" {
@@ -106,12 +221,10 @@ module "lambda" {
   function_name      = "${var.project_name}-processor"
   execution_role_arn = aws_iam_role.lambda.arn
   image_uri          = "${module.ecr.repository_url}:latest"
-  timeout            = 300
+  timeout            = local.processor_timeout
   memory_size        = 512
 
-  environment_variables = {
-    ENVIRONMENT = var.environment
-  }
+  environment_variables = local.processor_environment
 
   tags = var.tags
 }
@@ -121,7 +234,11 @@ resource "aws_lambda_event_source_mapping" "orders" {
   event_source_arn = module.orders_queue.queue_arn
   function_name    = module.lambda.function_name
   batch_size       = 10
-  
+  enabled          = !var.enable_ecs_consumer # the ECS consumer takes over
+
+  # Only the messages the handler lists in batchItemFailures are retried
+  function_response_types = ["ReportBatchItemFailures"]
+
   scaling_config {
     maximum_concurrency = 10
   }
@@ -130,5 +247,8 @@ resource "aws_lambda_event_source_mapping" "orders" {
 resource "aws_lambda_event_source_mapping" "transactions" {
   event_source_arn = module.transactions_queue.queue_arn
   function_name    = module.lambda.function_name
-  batch_size       = 1 # Process one at a time for FIFO
+  batch_size       = 10 # Groups run in parallel, messages within a group in order
+  enabled          = !var.enable_ecs_consumer
+
+  function_response_types = ["ReportBatchItemFailures"]
 }
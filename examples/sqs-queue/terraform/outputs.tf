@@ -18,11 +18,31 @@ output "transactions_queue_url" {
   value       = module.transactions_queue.queue_url
 }
 
+output "unknown_queue_url" {
+  description = "Queue receiving messages of no registered type"
+  value       = module.unknown_queue.queue_url
+}
+
+output "payload_bucket_name" {
+  description = "S3 bucket for claim-check payloads"
+  value       = aws_s3_bucket.payloads.id
+}
+
 output "lambda_function_name" {
   description = "Lambda function name"
   value       = module.lambda.function_name
 }
 
+output "consumer_service_name" {
+  description = "ECS consumer service name (null unless enable_ecs_consumer)"
+  value       = var.enable_ecs_consumer ? module.consumer[0].service_name : null
+}
+
+output "consumer_cluster_name" {
+  description = "ECS consumer cluster name (null unless enable_ecs_consumer)"
+  value       = var.enable_ecs_consumer ? module.consumer[0].cluster_name : null
+}
+
 output "ecr_repository_url" {
   description = "ECR repository URL"
   value       = module.ecr.repository_url
@@ -16,6 +16,83 @@ variable "environment" {
   default     = "dev"
 }
 
+variable "max_concurrency" {
+  description = "Handler calls run in parallel within a batch"
+  type        = number
+  default     = 10
+}
+
+variable "log_sample_rate" {
+  description = "Fraction of messages logged on success (errors are always logged)"
+  type        = number
+  default     = 0.01
+}
+
+variable "log_body" {
+  description = "How message bodies appear in logs: none, truncate or full"
+  type        = string
+  default     = "truncate"
+
+  validation {
+    condition     = contains(["none", "truncate", "full"], var.log_body)
+    error_message = "log_body must be none, truncate or full."
+  }
+}
+
+variable "log_redact_fields" {
+  description = "Body fields replaced with [REDACTED] in logs"
+  type        = list(string)
+  default     = []
+}
+
+variable "dedup_ttl_seconds" {
+  description = "Seconds a processed message's dedup key is remembered"
+  type        = number
+  default     = 86400
+}
+
+variable "payload_retention_days" {
+  description = "Days claim-check payloads are kept in S3 (must outlive queue and DLQ retention)"
+  type        = number
+  default     = 15
+}
+
+variable "enable_ecs_consumer" {
+  description = "Consume the queues with a long-running ECS service instead of Lambda"
+  type        = bool
+  default     = false
+}
+
+variable "consumer_cpu" {
+  description = "CPU units of an ECS consumer task"
+  type        = string
+  default     = "256"
+}
+
+variable "consumer_memory" {
+  description = "Memory (MiB) of an ECS consumer task"
+  type        = string
+  default     = "512"
+}
+
+variable "consumer_receive_loops" {
+  description = "Concurrent long-poll receive loops per queue in each consumer task"
+  type        = number
+  default     = 2
+}
+
+variable "consumer_max_in_flight" {
+  description = "Messages a consumer task holds at once, received but not yet deleted"
+  type        = number
+  default     = 100
+}
+
+variable "consumer_max_tasks" {
+  description = "Maximum number of consumer tasks (scaled on CPU)"
+  type        = number
+  default     = 4
+}
+
 variable "tags" {
   description = "Tags"
   type        = map(string)
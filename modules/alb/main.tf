@@ -92,6 +92,7 @@ resource "aws_lb" "this" {
   load_balancer_type = "application"
   security_groups    = [aws_security_group.alb.id]
   subnets            = var.subnet_ids
+  idle_timeout       = var.idle_timeout
 
   dynamic "access_logs" {
     for_each = var.enable_access_logs ? [1] : []
@@ -36,6 +36,12 @@ variable "listener_port" {
   default     = 80
 }
 
+variable "idle_timeout" {
+  description = "Seconds a connection may stay idle; keep it below the targets' keep-alive timeout"
+  type        = number
+  default     = 60
+}
+
 variable "deregistration_delay" {
   description = "Time in seconds for connection draining"
   type        = number
@@ -8,6 +8,22 @@ terraform {
   }
 }
 
+locals {
+  gsi_key_attributes = flatten([
+    for gsi in var.global_secondary_indexes : concat(
+      [{ name = gsi.hash_key, type = gsi.hash_key_type }],
+      gsi.range_key != null ? [{ name = gsi.range_key, type = gsi.range_key_type }] : []
+    )
+  ])
+
+  # GSI key attributes that are not table keys, declared once even when
+  # several indexes share them
+  gsi_attributes = {
+    for attr in local.gsi_key_attributes : attr.name => attr.type...
+    if !contains(compact([var.hash_key, var.range_key]), attr.name)
+  }
+}
+
 resource "aws_dynamodb_table" "this" {
   name           = var.table_name
   billing_mode   = var.billing_mode
@@ -31,18 +47,10 @@ resource "aws_dynamodb_table" "this" {
 
   # Additional attributes for GSI
   dynamic "attribute" {
-    for_each = var.global_secondary_indexes
-    content {
-      name = attribute.value.hash_key
-      type = "S"
-    }
-  }
-
-  dynamic "attribute" {
-    for_each = [for gsi in var.global_secondary_indexes : gsi if gsi.range_key != null]
+    for_each = local.gsi_attributes
     content {
-      name = attribute.value.range_key
-      type = "S"
+      name = attribute.key
+      type = attribute.value[0]
     }
   }
 
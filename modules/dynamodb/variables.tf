@@ -128,7 +128,9 @@ variable "global_secondary_indexes" {
   type = list(object({
     name            = string
     hash_key        = string
+    hash_key_type   = optional(string, "S")
     range_key       = optional(string)
+    range_key_type  = optional(string, "S")
     projection_type = string
     read_capacity   = optional(number)
     write_capacity  = optional(number)
@@ -51,10 +51,11 @@ resource "aws_ecs_task_definition" "this" {
     name      = var.container_name
     image     = var.container_image
     essential = true
-    portMappings = [{
+    portMappings = var.container_port != null ? [{
       containerPort = var.container_port
       protocol      = "tcp"
-    }]
+    }] : []
+    stopTimeout = var.stop_timeout
     logConfiguration = {
       logDriver = "awslogs"
       options = {
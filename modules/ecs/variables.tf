@@ -24,8 +24,15 @@ variable "container_image" {
 }
 
 variable "container_port" {
-  description = "Port exposed by the container"
+  description = "Port exposed by the container (null for workers that serve no traffic)"
   type        = number
+  default     = null
+}
+
+variable "stop_timeout" {
+  description = "Seconds the container gets to exit after SIGTERM before it is killed (max 120 on Fargate)"
+  type        = number
+  default     = null
 }
 
 variable "cpu" {